@@ -1,37 +1,356 @@
 import cv2
 import numpy as np
+import os
+import json
+import queue
+import re
+import socket
 import time
-import firebase_admin
-from firebase_admin import credentials, db
-from datetime import datetime
+import uuid
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import firebase_lokal
+import log_event
+from event_bus import EventBus
+from katalog import KatalogBarang
+
+# Karakter yang tidak boleh ada di key Firebase, di-escape seperti URL encoding
+KEY_ESCAPE = {'%': '%25', '.': '%2E', '$': '%24', '#': '%23', '[': '%5B', ']': '%5D', '/': '%2F'}
+
+def kunci_aman(teks):
+    """Ubah teks bebas (payload QR, nama stasiun) menjadi key Firebase yang valid"""
+    teks = str(teks)
+    if not any(c in KEY_ESCAPE for c in teks):
+        return teks or '%00'
+    return ''.join(KEY_ESCAPE.get(c, c) for c in teks)
+
+def nama_bucket(waktu, shard='hari'):
+    """
+    Path bucket history untuk sebuah waktu
+
+    Args:
+        waktu: datetime event
+        shard: 'hari' -> '2024-05-01', 'jam' -> '2024-05-01/13'
+    """
+    if shard == 'jam':
+        return waktu.strftime('%Y-%m-%d/%H')
+    return waktu.strftime('%Y-%m-%d')
+
+# Nama bucket history: hari (YYYY-MM-DD) atau jam (HH) di dalam bucket hari
+POLA_BUCKET = re.compile(r'^(\d{4}-\d{2}-\d{2}|\d{2})$')
+
+def daftar_bucket(mulai, selesai, shard='hari'):
+    """Semua bucket yang mencakup rentang waktu [mulai, selesai], urut waktu"""
+    if shard == 'jam':
+        langkah = timedelta(hours=1)
+        waktu = mulai.replace(minute=0, second=0, microsecond=0)
+    else:
+        langkah = timedelta(days=1)
+        waktu = mulai.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    buckets = []
+    while waktu <= selesai:
+        buckets.append(nama_bucket(waktu, shard))
+        waktu += langkah
+    return buckets
+
+# Digit base36 untuk key history yang ringkas
+DIGIT36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+def basis36(n):
+    """Bilangan bulat non-negatif sebagai string base36"""
+    if n == 0:
+        return '0'
+    hasil = []
+    while n:
+        n, sisa = divmod(n, 36)
+        hasil.append(DIGIT36[sisa])
+    return ''.join(reversed(hasil))
+
+def buat_session_id():
+    """Id sesi 12 karakter base36: detik mulai (7 digit) ditambah 5 digit acak"""
+    return (basis36(int(time.time())).rjust(7, '0')
+            + basis36(uuid.uuid4().int % 36 ** 5).rjust(5, '0'))
+
+def kunci_scan(session_id, urutan):
+    """Key history deterministik untuk satu scan: id sesi + nomor urut base36"""
+    return session_id + basis36(urutan)
+
+def waktu_push_id(key):
+    """Waktu (datetime) yang tersimpan di 8 karakter pertama push ID Firebase"""
+    try:
+        ms = 0
+        for c in key[:8]:
+            ms = ms * 64 + firebase_lokal.PUSH_CHARS.index(c)
+        return datetime.fromtimestamp(ms / 1000.0)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+# Versi format record history yang ditulis
+RECORD_VERSI = 2
+
+# Resolusi rollup dashboard -> format key waktu (urut leksikografis = urut waktu)
+FORMAT_ROLLUP = {'minute': '%Y%m%d%H%M', 'hour': '%Y%m%d%H'}
+
+def kunci_rollup(waktu, resolusi='minute'):
+    """
+    Key bucket rollup untuk sebuah waktu
+
+    Args:
+        waktu: datetime, atau epoch milidetik
+        resolusi: 'minute' -> '202405011307', 'hour' -> '2024050113'
+    """
+    if not isinstance(waktu, datetime):
+        waktu = datetime.fromtimestamp(waktu / 1000.0)
+    return waktu.strftime(FORMAT_ROLLUP[resolusi])
+
+def buat_record(qr_data, timestamp_ms, station_id, urutan):
+    """
+    Record history format ringkas (v2); mode tidak disimpan karena tersirat dari path
+
+    Args:
+        qr_data: Isi QR code
+        timestamp_ms: Waktu event dalam milidetik epoch
+        station_id: ID stasiun pencatat
+        urutan: Nomor urut scan di dalam sesi (mulai 1); unik bersama stasiun dan sesi
+    """
+    return {
+        'v': RECORD_VERSI,
+        't': timestamp_ms,
+        'q': qr_data,
+        's': station_id,
+        'n': urutan
+    }
+
+def baca_record(record, mode):
+    """
+    Normalisasi record history versi lama (v1) maupun baru (v2)
+
+    Args:
+        record: Record mentah dari database
+        mode: 'masuk' atau 'keluar' (diambil dari path)
+
+    Returns:
+        Dict dengan qr_data, timestamp_ms, waktu (datetime), mode, stasiun, urutan, versi;
+        None jika record tidak dikenali
+    """
+    if not isinstance(record, dict):
+        return None
+
+    if record.get('v') == 2:
+        timestamp_ms = record.get('t')
+        hasil = {
+            'qr_data': record.get('q'),
+            'timestamp_ms': timestamp_ms,
+            'stasiun': record.get('s'),
+            'urutan': record.get('n'),
+            'versi': 2
+        }
+    elif 'qr_data' in record:
+        # v1: {'qr_data', 'waktu' (ISO), 'mode', 'stasiun' (opsional)}
+        try:
+            timestamp_ms = int(datetime.fromisoformat(record['waktu']).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            timestamp_ms = None
+        hasil = {
+            'qr_data': record['qr_data'],
+            'timestamp_ms': timestamp_ms,
+            'stasiun': record.get('stasiun'),
+            'urutan': None,
+            'versi': 1
+        }
+    else:
+        return None
+
+    hasil['mode'] = mode
+    hasil['waktu'] = datetime.fromtimestamp(timestamp_ms / 1000.0) if timestamp_ms is not None else None
+    return hasil
+
+def terapkan_event(data, event):
+    """
+    Gabungkan event listen (put/patch) ke salinan lokal sebuah node
+    
+    Returns:
+        Isi node setelah event diterapkan
+    """
+    segments = [seg for seg in event.path.split('/') if seg]
+    if event.event_type == 'patch':
+        for key, value in (event.data or {}).items():
+            data = isi_path(data, segments + [seg for seg in key.split('/') if seg], value)
+        return data
+    return isi_path(data, segments, event.data)
+
+def isi_path(data, segments, value):
+    """Tulis value di path relatif dalam dict bersarang (None berarti hapus)"""
+    if not segments:
+        return value
+    data = data if isinstance(data, dict) else {}
+    data[segments[0]] = isi_path(data.get(segments[0]), segments[1:], value)
+    if data[segments[0]] is None:
+        del data[segments[0]]
+    return data
 
 class FirebaseManager:
-    def __init__(self, credential_path, database_url):
+    def __init__(self, credential_path, database_url, station_id=None, history_shard='hari',
+                 batch_size=200, auto_flush=True, counter_shard=False, koneksi_latar=False,
+                 journal_path=None):
         """
         Inisialisasi koneksi Firebase
         
         Args:
             credential_path: Path ke file service account key (JSON)
-            database_url: URL database Firebase
+            database_url: URL database Firebase, atau lokal://nama?opsi untuk
+                database lokal (lihat firebase_lokal.py)
+            station_id: ID stasiun pencatat (default: hostname komputer)
+            history_shard: Pembagian history per 'hari' atau 'jam'; None untuk list datar lama
+            batch_size: Jumlah scan maksimal per multi-path update
+            auto_flush: Kirim langsung setiap scan; False untuk hanya menampung sampai flush()
+            counter_shard: Setiap stasiun menaikkan counter sendiri di penghitung/<stasiun>;
+                total dan ringkasan dihitung dari jumlah semua shard oleh agregasi()
+            koneksi_latar: Hubungkan di thread latar; scan selama menghubungkan ditampung di outbox
+            journal_path: File JSONL untuk outbox, agar scan yang belum terkirim tidak hilang
+                saat program berhenti
         """
+        self.station_id = kunci_aman(station_id or socket.gethostname())
+        self.history_shard = history_shard
+        self.log = log_event.default()
+        self.counter_shard = counter_shard
+        self.agregasi_thread = None
+        self.agregasi_stop = threading.Event()
+        
+        # Salinan lokal ringkasan (atau shard counter) yang diikuti lewat listen()
+        self.ringkasan_data = None
+        self.ringkasan_listener = None
+        
+        # Status reset bertahap di thread latar (dibaca panel)
+        self.reset_thread = None
+        self.reset_status = {'aktif': False, 'terhapus': 0, 'bucket': None, 'error': None}
+        
+        # Nomor urut event di dalam sesi ini; (stasiun, sesi, urutan) unik, dan key history
+        # dibuat dari sesi + urutan sehingga deduplikasi di server tidak butuh state di disk
+        self.urutan = 0
+        self.urutan_lock = threading.Lock()
+        
+        # Sesi membedakan nomor urut antar run program dan antar stasiun
+        self.session_id = buat_session_id()
+        
+        # Outbox: scan yang belum pasti tersimpan, dikirim per batch dan diulang jika gagal;
+        # jumlah per mode dijaga bersama pending (dengan outbox_lock) agar bisa dibaca O(1)
+        self.pending = deque()
+        self.tertunda = {'masuk': 0, 'keluar': 0}
+        self.outbox_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.auto_flush = auto_flush
+        self.attempt = 0
+        
+        # Journal outbox di disk
+        self.journal_path = journal_path
+        self.journal = None
+        self.muat_journal()
+        
+        # Status koneksi: 'menghubungkan', 'aktif', atau 'offline'
+        self.db = None
+        self.status_koneksi = 'menghubungkan'
+        self.saat_terhubung = []
+        
+        if koneksi_latar:
+            threading.Thread(target=self.hubungkan, args=(credential_path, database_url),
+                             daemon=True).start()
+        else:
+            self.hubungkan(credential_path, database_url)
+    
+    def hubungkan(self, credential_path, database_url):
+        """Buka koneksi database, lalu kirim scan yang tertampung selama menghubungkan"""
         try:
-            # Inisialisasi Firebase hanya sekali
-            if not firebase_admin._apps:
-                # Load credential dari file
-                cred = credentials.Certificate(credential_path)
-                # Inisialisasi app dengan database URL
-                firebase_admin.initialize_app(cred, {
-                    'databaseURL': database_url
-                })
-            
-            print("✅ Firebase berhasil diinisialisasi")
-            self.db = db.reference()
+            # Database lokal untuk pengujian dan benchmark, tanpa credential
+            if firebase_lokal.adalah_url_lokal(database_url):
+                ref = firebase_lokal.reference(database_url)
+                print(f"✅ Database lokal digunakan: {database_url}")
+            else:
+                # Import firebase_admin cukup berat, jadi baru dilakukan saat koneksi dibuat
+                import firebase_admin
+                from firebase_admin import credentials, db
+                
+                # Inisialisasi Firebase hanya sekali
+                if not firebase_admin._apps:
+                    # Load credential dari file
+                    cred = credentials.Certificate(credential_path)
+                    # Inisialisasi app dengan database URL
+                    firebase_admin.initialize_app(cred, {
+                        'databaseURL': database_url
+                    })
+                
+                print("✅ Firebase berhasil diinisialisasi")
+                ref = db.reference()
+            
+            self.db = ref
             self.setup_database_structure()
+            if self.counter_shard:
+                self.siapkan_penghitung()
             
         except Exception as e:
             print(f"❌ Error inisialisasi Firebase: {e}")
             # Jika Firebase gagal, tetap jalankan program tanpa Firebase
             self.db = None
+            self.status_koneksi = 'offline'
+            return
+        
+        self.status_koneksi = 'aktif'
+        for callback in self.saat_terhubung:
+            callback()
+        if self.pending:
+            self.flush()
+    
+    def muat_journal(self):
+        """
+        Muat scan yang belum terkirim dari journal run sebelumnya
+        
+        Bisa jadi sebagian sudah tersimpan sebelum program berhenti, jadi setiap event
+        ditandai untuk dicek keberadaannya sebelum dikirim ulang.
+        """
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                self.attempt += 1
+                event['cek'] = -self.attempt
+                self.pending.append(event)
+                self.tertunda[event['mode']] += 1
+        
+        if self.pending:
+            print(f"📥 {len(self.pending)} scan dari journal akan dikirim ulang")
+    
+    def tulis_journal(self, event):
+        """Tambahkan satu event ke journal (dipanggil dengan outbox_lock)"""
+        if not self.journal_path:
+            return
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        self.journal.write(json.dumps({key: event[key] for key in ('key', 'mode', 'path', 'record')},
+                                      ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.journal.flush()
+    
+    def kosongkan_journal(self):
+        """Outbox sudah kosong: journal tidak diperlukan lagi (dipanggil dengan outbox_lock)"""
+        if not self.journal_path:
+            return
+        if self.journal is None:
+            if not os.path.exists(self.journal_path) or not os.path.getsize(self.journal_path):
+                return
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        if self.journal.tell():
+            self.journal.seek(0)
+            self.journal.truncate()
     
     def setup_database_structure(self):
         """Setup struktur database awal jika belum ada"""
@@ -57,8 +376,8 @@ class FirebaseManager:
                 }
             }
             
-            # Cek apakah database sudah ada data
-            existing_data = self.db.get()
+            # Cek apakah database sudah ada data (shallow: hanya nama node teratas)
+            existing_data = self.db.get(shallow=True)
             if not existing_data:
                 self.db.set(initial_data)
                 print("✅ Struktur database diinisialisasi")
@@ -70,137 +389,613 @@ class FirebaseManager:
     
     def send_barang_masuk(self, qr_data):
         """Mengirim data barang masuk ke Firebase"""
-        if not self.db:
+        return self.kirim_scan('masuk', qr_data)
+    
+    def send_barang_keluar(self, qr_data):
+        """Mengirim data barang keluar ke Firebase"""
+        return self.kirim_scan('keluar', qr_data)
+    
+    def kirim_scan(self, mode, qr_data, timestamp=None):
+        """
+        Catat satu scan ke outbox lalu kirim
+        
+        Args:
+            mode: 'masuk' atau 'keluar'
+            qr_data: Isi QR code
+            timestamp: Waktu scan (datetime, default: sekarang)
+        
+        Returns:
+            True jika scan sudah tersimpan di database; False jika masih tertunda di outbox
+            (akan dikirim ulang pada flush berikutnya)
+        """
+        return self.kirim_event(self.catat_scan(mode, qr_data, timestamp))
+    
+    def catat_scan(self, mode, qr_data, timestamp=None):
+        """
+        Masukkan satu scan ke outbox dan journal, tanpa jaringan
+        
+        Setiap scan mendapat key deterministik dari sesi dan nomor urut (base36, sekitar 13
+        karakter, lebih pendek dari push ID), sehingga pengiriman ulang setelah timeout tidak
+        pernah menggandakan data. Stasiun tidak diulang di key karena sudah ada di record.
+        
+        Dipanggil langsung dari thread frame: journal ditulis sinkron (write + flush ke OS,
+        tanpa fsync), jadi setelah fungsi ini selesai scan tidak hilang walaupun program
+        berhenti sebelum terkirim.
+        
+        Returns:
+            Event outbox (untuk kirim_event)
+        """
+        timestamp = timestamp or datetime.now()
+        urutan = self.urutan_berikutnya()
+        event = {
+            'key': kunci_scan(self.session_id, urutan),
+            'mode': mode,
+            'path': self.history_path(mode, timestamp),
+            'record': buat_record(qr_data, int(timestamp.timestamp() * 1000), self.station_id, urutan),
+            'cek': None
+        }
+        
+        with self.outbox_lock:
+            self.pending.append(event)
+            self.tertunda[mode] += 1
+            self.tulis_journal(event)
+        return event
+    
+    def kirim_event(self, event):
+        """
+        Kirim outbox sampai event dari catat_scan() tersimpan
+        
+        Returns:
+            True jika event sudah tersimpan di database; False jika masih tertunda
+        """
+        mode = event['mode']
+        qr_data = event['record']['q']
+        with self.outbox_lock:
+            tertunda = any(e is event for e in self.pending)
+        # Sudah ikut terkirim di batch sebelumnya
+        if not tertunda:
+            return True
+        
+        if not self.db or not self.auto_flush:
+            return False
+        
+        self.flush()
+        with self.outbox_lock:
+            tertunda = any(e is event for e in self.pending)
+        
+        if tertunda:
+            self.log.warning('tertunda', f"❌ Data {mode} tertunda di outbox: {qr_data}",
+                             mode=mode, qr=qr_data, key=event['key'])
             return False
+        
+        self.log.info('terkirim', f"✅ Data {mode} dikirim ke Firebase: {qr_data}",
+                      mode=mode, qr=qr_data, key=event['key'])
+        return True
+    
+    def batch_update(self, events):
+        """Multi-path update untuk satu batch: history dan semua counter dalam satu request atomik"""
+        jumlah = {'masuk': 0, 'keluar': 0}
+        stok = {}
+        rollup = {}
+        update = {}
+        for event in events:
+            update[f"{event['path']}/{event['key']}"] = event['record']
+            jumlah[event['mode']] += 1
             
+            # Rollup per menit dan per jam memakai waktu scan, bukan waktu kirim
+            for resolusi in FORMAT_ROLLUP:
+                path = f"rollups/{resolusi}/{kunci_rollup(event['record']['t'], resolusi)}/{event['mode']}"
+                rollup[path] = rollup.get(path, 0) + 1
+            
+            # Stok per barang ikut dalam commit yang sama dengan history
+            item = stok.setdefault(kunci_aman(event['record']['q']), [0, None])
+            item[0] += 1 if event['mode'] == 'masuk' else -1
+            item[1] = event
+        
+        for key, (delta, terakhir) in stok.items():
+            if delta:
+                update[f"stok/{key}/jumlah"] = {'.sv': {'increment': delta}}
+            update[f"stok/{key}/terakhir"] = {'t': terakhir['record']['t'], 'm': terakhir['mode']}
+        
+        for path, n in rollup.items():
+            update[path] = {'.sv': {'increment': n}}
+        
+        if self.counter_shard:
+            # Hanya node milik stasiun ini yang ditulis, tidak ada node panas bersama
+            shard = f"penghitung/{self.station_id}"
+            for mode, n in jumlah.items():
+                if n:
+                    update[f"{shard}/{mode}"] = {'.sv': {'increment': n}}
+            update[f"{shard}/last_update"] = datetime.now().isoformat()
+            return update
+        
+        for mode, n in jumlah.items():
+            if n:
+                update[f"barang_{mode}/total"] = {'.sv': {'increment': n}}
+                update[f"ringkasan/total_{mode}"] = {'.sv': {'increment': n}}
+        
+        update['ringkasan/sisa_barang'] = {'.sv': {'increment': jumlah['masuk'] - jumlah['keluar']}}
+        update['ringkasan/last_update'] = datetime.now().isoformat()
+        return update
+    
+    def siapkan_penghitung(self):
+        """
+        Isi shard dasar penghitung/_awal dari total yang sudah ada sebelum mode shard dipakai
+        
+        agregasi() menulis jumlah semua shard secara absolut, jadi tanpa shard dasar ini
+        total lama di barang_*/total akan tertimpa jumlah shard baru. Transaksi pada node
+        penghitung memastikan hanya stasiun pertama yang mengisinya.
+        """
         try:
-            timestamp = datetime.now()
-            timestamp_str = timestamp.isoformat()
-            
-            # Data untuk history
-            history_data = {
-                'qr_data': qr_data,
-                'waktu': timestamp_str,
-                'mode': 'masuk'
+            if self.db.child('penghitung').get(shallow=True):
+                return
+            
+            awal = {
+                'masuk': self.db.child('barang_masuk').child('total').get() or 0,
+                'keluar': self.db.child('barang_keluar').child('total').get() or 0
             }
             
-            # Kirim ke history
-            history_ref = self.db.child('barang_masuk').child('history')
-            history_ref.push(history_data)
+            def isi(data):
+                return data if data else {'_awal': awal}
             
-            # Update total barang masuk
-            total_ref = self.db.child('barang_masuk').child('total')
-            current_total = total_ref.get() or 0
-            total_ref.set(current_total + 1)
+            self.db.child('penghitung').transaction(isi)
+            print(f"✅ Counter shard dasar: {awal['masuk']} masuk, {awal['keluar']} keluar")
+        except Exception as e:
+            print(f"⚠ Peringatan shard dasar penghitung: {e}")
+    
+    def baca_penghitung(self):
+        """
+        Jumlahkan semua shard counter (dibaca langsung, tanpa menunggu agregasi)
+        
+        Termasuk shard dasar _awal (total sebelum mode shard diaktifkan).
+        
+        Returns:
+            Dict total_masuk, total_keluar, sisa_barang, dan stasiun (counter per stasiun)
+        """
+        shards = self.db.child('penghitung').get() or {}
+        total_masuk = sum(shard.get('masuk', 0) for shard in shards.values())
+        total_keluar = sum(shard.get('keluar', 0) for shard in shards.values())
+        return {
+            'total_masuk': total_masuk,
+            'total_keluar': total_keluar,
+            'sisa_barang': total_masuk - total_keluar,
+            'stasiun': {nama: {'masuk': shard.get('masuk', 0), 'keluar': shard.get('keluar', 0)}
+                        for nama, shard in shards.items()}
+        }
+    
+    def baca_stok(self, qr_data):
+        """
+        Stok satu barang dari node stok/<qr> (tanpa membaca history)
+        
+        Returns:
+            Dict jumlah dan terakhir ({'t': epoch ms, 'm': mode}), atau None jika belum pernah discan
+        """
+        if not self.db:
+            return None
+        return self.db.child('stok').child(kunci_aman(qr_data)).get()
+    
+    def baca_rollup(self, resolusi='minute', mulai=None, selesai=None):
+        """
+        Jumlah scan per bucket waktu dari node rollups (tanpa membaca history)
+        
+        Args:
+            resolusi: 'minute' atau 'hour'
+            mulai, selesai: Rentang waktu (datetime), None untuk tanpa batas
+        
+        Returns:
+            Dict key bucket -> {'masuk': n, 'keluar': n}, urut waktu
+        """
+        if not self.db:
+            return {}
+        
+        query = self.db.child('rollups').child(resolusi).order_by_key()
+        if mulai is not None:
+            query = query.start_at(kunci_rollup(mulai, resolusi))
+        if selesai is not None:
+            query = query.end_at(kunci_rollup(selesai, resolusi))
+        
+        data = query.get() or {}
+        return {key: {'masuk': nilai.get('masuk', 0), 'keluar': nilai.get('keluar', 0)}
+                for key, nilai in sorted(data.items())}
+    
+    def jumlah_tertunda(self):
+        """Jumlah scan per mode yang masih di outbox, termasuk batch yang sedang dikirim"""
+        with self.outbox_lock:
+            return dict(self.tertunda)
+    
+    def buang_dari_outbox(self, syarat):
+        """Keluarkan event yang memenuhi syarat dari outbox (dipanggil dengan outbox_lock)"""
+        sisa = deque()
+        for event in self.pending:
+            if syarat(event):
+                self.tertunda[event['mode']] -= 1
+            else:
+                sisa.append(event)
+        self.pending = sisa
+    
+    def ikuti_ringkasan(self, callback):
+        """
+        Ikuti total masuk/keluar secara realtime dengan satu listener (tanpa polling)
+        
+        Event pertama listener berisi nilai saat ini, jadi tidak perlu get() terpisah.
+        Koneksi dibuka di thread latar agar startup tidak menunggu jaringan.
+        
+        Args:
+            callback: Dipanggil dengan (total_masuk, total_keluar) setiap ada perubahan
+        """
+        if self.ringkasan_listener is not None:
+            return
+        if not self.db:
+            # Masih menghubungkan: mulai listener setelah koneksi siap
+            if self.status_koneksi == 'menghubungkan':
+                self.saat_terhubung.append(lambda: self.ikuti_ringkasan(callback))
+            return
+        
+        path = 'penghitung' if self.counter_shard else 'ringkasan'
+        
+        def on_event(event):
+            self.ringkasan_data = terapkan_event(self.ringkasan_data, event)
+            data = self.ringkasan_data if isinstance(self.ringkasan_data, dict) else {}
+            if self.counter_shard:
+                total_masuk = sum(shard.get('masuk', 0) for shard in data.values() if isinstance(shard, dict))
+                total_keluar = sum(shard.get('keluar', 0) for shard in data.values() if isinstance(shard, dict))
+            else:
+                total_masuk = data.get('total_masuk', 0)
+                total_keluar = data.get('total_keluar', 0)
+            callback(total_masuk, total_keluar)
+        
+        def mulai():
+            try:
+                self.ringkasan_listener = self.db.child(path).listen(on_event)
+            except Exception as e:
+                print(f"❌ Error listen {path}: {e}")
+        
+        threading.Thread(target=mulai, daemon=True).start()
+    
+    def hentikan_ringkasan(self):
+        """Tutup listener ringkasan"""
+        if self.ringkasan_listener is not None:
+            self.ringkasan_listener.close()
+            self.ringkasan_listener = None
+    
+    def agregasi(self):
+        """
+        Tulis total dan ringkasan dari jumlah semua shard
+        
+        Nilai ditulis absolut (bukan increment), sehingga aman dijalankan oleh lebih dari
+        satu stasiun sekaligus.
+        """
+        if not self.db:
+            return None
+        
+        try:
+            hasil = self.baca_penghitung()
+            self.db.update({
+                'barang_masuk/total': hasil['total_masuk'],
+                'barang_keluar/total': hasil['total_keluar'],
+                'ringkasan/total_masuk': hasil['total_masuk'],
+                'ringkasan/total_keluar': hasil['total_keluar'],
+                'ringkasan/sisa_barang': hasil['sisa_barang'],
+                'ringkasan/last_update': datetime.now().isoformat()
+            })
+            return hasil
+        except Exception as e:
+            print(f"❌ Error agregasi counter: {e}")
+            return None
+    
+    def mulai_agregasi(self, interval=5.0):
+        """Jalankan agregasi berkala di thread latar"""
+        if self.agregasi_thread is not None:
+            return
+        
+        def loop():
+            while not self.agregasi_stop.wait(interval):
+                self.agregasi()
+        
+        self.agregasi_stop.clear()
+        self.agregasi_thread = threading.Thread(target=loop, daemon=True)
+        self.agregasi_thread.start()
+    
+    def hentikan_agregasi(self):
+        """Hentikan agregasi berkala dan jalankan agregasi terakhir"""
+        if self.agregasi_thread is None:
+            return
+        self.agregasi_stop.set()
+        self.agregasi_thread.join()
+        self.agregasi_thread = None
+        self.agregasi()
+    
+    def cek_tertunda(self):
+        """
+        Pastikan nasib batch yang gagal dengan status tidak pasti (misal timeout)
+        
+        Multi-path update bersifat atomik: jika satu record batch sudah ada, seluruh batch
+        (termasuk counter) sudah tersimpan dan tidak boleh dikirim ulang.
+        """
+        with self.outbox_lock:
+            percobaan = {}
+            for event in self.pending:
+                if event['cek'] is not None and event['cek'] not in percobaan:
+                    percobaan[event['cek']] = event
+        
+        for attempt, event in percobaan.items():
+            tersimpan = self.db.child(f"{event['path']}/{event['key']}").get() is not None
+            with self.outbox_lock:
+                if tersimpan:
+                    self.buang_dari_outbox(lambda e: e['cek'] == attempt)
+                else:
+                    for e in self.pending:
+                        if e['cek'] == attempt:
+                            e['cek'] = None
+    
+    def flush(self):
+        """
+        Kirim semua scan di outbox per batch
+        
+        Returns:
+            True jika outbox kosong setelah flush
+        """
+        if not self.db:
+            return False
+        
+        with self.flush_lock:
+            try:
+                self.cek_tertunda()
+            except Exception as e:
+                self.log.error('cek_gagal', f"❌ Error cek outbox: {e}", error=str(e))
+                return False
             
-            # Update ringkasan
-            self.update_ringkasan()
+            while True:
+                with self.outbox_lock:
+                    batch = list(self.pending)[:self.batch_size]
+                    if not batch:
+                        self.kosongkan_journal()
+                if not batch:
+                    return True
+                
+                self.attempt += 1
+                try:
+                    self.db.update(self.batch_update(batch))
+                except Exception as e:
+                    # Status tidak pasti: bisa jadi server sudah menyimpan, dicek sebelum kirim ulang
+                    self.log.error('kirim_gagal', f"❌ Error mengirim batch ({len(batch)} scan): {e}",
+                                   jumlah=len(batch), attempt=self.attempt, error=str(e))
+                    with self.outbox_lock:
+                        for event in batch:
+                            event['cek'] = self.attempt
+                    return False
+                
+                with self.outbox_lock:
+                    terkirim = set(id(event) for event in batch)
+                    self.buang_dari_outbox(lambda e: id(e) in terkirim)
+    
+    def urutan_berikutnya(self):
+        """Nomor urut event berikutnya dari stasiun ini"""
+        with self.urutan_lock:
+            self.urutan += 1
+            return self.urutan
+    
+    def history_path(self, mode, waktu):
+        """Path history untuk mode dan waktu event"""
+        path = f"barang_{mode}/history"
+        if self.history_shard:
+            path += "/" + nama_bucket(waktu, self.history_shard)
+        return path
+    
+    def iter_history(self, mode, mulai=None, selesai=None, stasiun=None):
+        """
+        Ambil history per bucket untuk rentang waktu tertentu, tanpa mengunduh seluruh history
+        
+        Args:
+            mode: 'masuk' atau 'keluar'
+            mulai: datetime awal (default: 24 jam sebelum selesai)
+            selesai: datetime akhir (default: sekarang)
+            stasiun: Hanya ambil event dari stasiun ini (butuh .indexOn ["s", "stasiun"] di rules)
+        
+        Yields:
+            (key, record) urut waktu, record sudah dinormalisasi dengan baca_record
+        """
+        if not self.db:
+            return
+        
+        selesai = selesai or datetime.now()
+        mulai = mulai or selesai - timedelta(days=1)
+        
+        if self.history_shard:
+            paths = [f"barang_{mode}/history/{bucket}"
+                     for bucket in daftar_bucket(mulai, selesai, self.history_shard)]
+        else:
+            paths = [f"barang_{mode}/history"]
+        
+        mulai_ms = int(mulai.timestamp() * 1000)
+        selesai_ms = int(selesai.timestamp() * 1000)
+        
+        for path in paths:
+            ref = self.db.child(path)
+            if stasiun is not None:
+                # Record v2 menyimpan stasiun di 's', record v1 di 'stasiun'
+                data = {}
+                for field in ('s', 'stasiun'):
+                    data.update(ref.order_by_child(field).equal_to(kunci_aman(stasiun)).get() or {})
+            else:
+                data = ref.get()
             
-            print(f"✅ Data masuk dikirim ke Firebase: {qr_data}")
-            return True
+            if not isinstance(data, dict):
+                continue
             
+            # Bucket di tepi rentang bisa berisi event di luar rentang
+            records = []
+            for key, raw in data.items():
+                record = baca_record(raw, mode)
+                if record and record['timestamp_ms'] is not None and mulai_ms <= record['timestamp_ms'] <= selesai_ms:
+                    records.append((key, record))
+            records.sort(key=lambda item: item[1]['timestamp_ms'])
+            for item in records:
+                yield item
+    
+    def query_history(self, mode, mulai=None, selesai=None, stasiun=None):
+        """Seperti iter_history, tetapi mengembalikan list"""
+        try:
+            return list(self.iter_history(mode, mulai, selesai, stasiun))
         except Exception as e:
-            print(f"❌ Error mengirim data masuk: {e}")
-            return False
+            print(f"❌ Error query history: {e}")
+            return []
     
-    def send_barang_keluar(self, qr_data):
-        """Mengirim data barang keluar ke Firebase"""
-        if not self.db:
+    def reset_database_bertahap(self, chunk=500, arsip_path=None):
+        """
+        Reset database di thread latar, menghapus history per potongan kecil
+        
+        History yang tercatat sebelum reset dihapus bucket demi bucket sehingga tidak ada
+        request raksasa yang memblokir loop video. Counter, rollup, dan stok dikurangi tepat
+        sebanyak record yang dihapus, dalam update yang sama dengan penghapusannya, jadi
+        scan baru selama reset (termasuk kiriman outbox yang terlambat) tetap terhitung.
+        
+        Args:
+            chunk: Jumlah record per request hapus
+            arsip_path: Jika diisi, record disalin ke file JSONL ini sebelum dihapus
+        
+        Returns:
+            True jika reset dimulai; False jika database tidak ada atau reset masih berjalan
+        """
+        if not self.db or (self.reset_thread is not None and self.reset_thread.is_alive()):
             return False
-            
+        
+        self.reset_status = {'aktif': True, 'terhapus': 0, 'bucket': None, 'error': None}
+        self.reset_thread = threading.Thread(target=self.jalankan_reset, args=(chunk, arsip_path),
+                                             daemon=True)
+        self.reset_thread.start()
+        return True
+    
+    def jalankan_reset(self, chunk, arsip_path):
+        """Isi thread reset bertahap"""
+        arsip = None
         try:
-            timestamp = datetime.now()
-            timestamp_str = timestamp.isoformat()
-            
-            # Data untuk history
-            history_data = {
-                'qr_data': qr_data,
-                'waktu': timestamp_str,
-                'mode': 'keluar'
-            }
+            # Scan yang masih di outbox tercatat sebelum reset, kirim dulu agar ikut terhapus
+            self.flush()
             
-            # Kirim ke history
-            history_ref = self.db.child('barang_keluar').child('history')
-            history_ref.push(history_data)
+            batas_ms = int(time.time() * 1000)
             
-            # Update total barang keluar
-            total_ref = self.db.child('barang_keluar').child('total')
-            current_total = total_ref.get() or 0
-            total_ref.set(current_total + 1)
+            if arsip_path:
+                arsip = open(arsip_path, 'a', encoding='utf-8')
             
-            # Update ringkasan
-            self.update_ringkasan()
-            
-            print(f"✅ Data keluar dikirim ke Firebase: {qr_data}")
-            return True
+            for mode in ('masuk', 'keluar'):
+                self.hapus_history_bertahap(mode, f"barang_{mode}/history", batas_ms, chunk, arsip)
             
+            print(f"✅ Database berhasil direset ({self.reset_status['terhapus']} record history dihapus)")
         except Exception as e:
-            print(f"❌ Error mengirim data keluar: {e}")
-            return False
+            self.reset_status['error'] = str(e)
+            print(f"❌ Error reset database: {e}")
+        finally:
+            if arsip:
+                arsip.close()
+            self.reset_status['aktif'] = False
+            self.reset_status['bucket'] = None
     
-    def update_ringkasan(self):
-        """Update data ringkasan di Firebase"""
-        if not self.db:
-            return
+    def hapus_history_bertahap(self, mode, path, batas_ms, chunk, arsip):
+        """Hapus record di path (dan bucket di bawahnya) yang tercatat sebelum batas_ms"""
+        ref = self.db.child(path)
+        
+        # Nama anak saja (shallow), tanpa mengunduh isi bucket
+        anak = ref.get(shallow=True) or {}
+        for nama in sorted(anak):
+            if POLA_BUCKET.match(nama):
+                self.hapus_history_bertahap(mode, f"{path}/{nama}", batas_ms, chunk, arsip)
+        
+        self.reset_status['bucket'] = path
+        start_key = None
+        while True:
+            query = ref.order_by_key()
+            if start_key is not None:
+                query = query.start_at(start_key)
+            page = query.limit_to_first(chunk + (1 if start_key else 0)).get() or {}
             
-        try:
-            # Ambil total masuk dan keluar
-            total_masuk_ref = self.db.child('barang_masuk').child('total')
-            total_keluar_ref = self.db.child('barang_keluar').child('total')
-            
-            total_masuk = total_masuk_ref.get() or 0
-            total_keluar = total_keluar_ref.get() or 0
-            sisa_barang = total_masuk - total_keluar
-            
-            # Update ringkasan
-            ringkasan_data = {
-                'total_masuk': total_masuk,
-                'total_keluar': total_keluar,
-                'sisa_barang': sisa_barang,
-                'last_update': datetime.now().isoformat()
-            }
+            items = [(key, record) for key, record in page.items()
+                     if key != start_key and not POLA_BUCKET.match(key)]
+            if not items:
+                break
+            start_key = items[-1][0]
             
-            self.db.child('ringkasan').set(ringkasan_data)
+            hapus = {}
+            for key, record in items:
+                hasil = baca_record(record, mode)
+                if hasil and hasil['timestamp_ms'] is not None and hasil['timestamp_ms'] > batas_ms:
+                    continue
+                hapus[key] = hasil
+                if arsip:
+                    arsip.write(json.dumps({'path': path, 'key': key, 'record': record},
+                                           separators=(',', ':'), ensure_ascii=False) + '\n')
             
-        except Exception as e:
-            print(f"❌ Error update ringkasan: {e}")
+            if not hapus:
+                continue
+            
+            if arsip:
+                # Arsip harus aman di disk sebelum data di server dihapus
+                arsip.flush()
+                os.fsync(arsip.fileno())
+            
+            self.db.update(self.update_hapus(mode, path, hapus))
+            self.reset_status['terhapus'] += len(hapus)
     
-    def reset_database(self):
-        """Reset semua data di database"""
-        if not self.db:
-            return False
+    def update_hapus(self, mode, path, hapus):
+        """
+        Multi-path update untuk menghapus satu potongan history beserta hitungannya
+        
+        Kebalikan dari batch_update: counter, rollup, dan stok dikurangi tepat sebanyak
+        record yang ikut dihapus, sehingga penghapusan dan pengurangan terjadi atomik.
+        
+        Args:
+            mode: 'masuk' atau 'keluar'
+            path: Path bucket history
+            hapus: Dict key -> record hasil baca_record (None jika record tidak dikenali)
+        """
+        update = {}
+        kurang = {}
+        
+        def tambah(path_counter, n):
+            kurang[path_counter] = kurang.get(path_counter, 0) + n
+        
+        for key, hasil in hapus.items():
+            update[f"{path}/{key}"] = None
+            if hasil is None:
+                continue
             
-        try:
-            # Reset ke struktur awal
-            initial_data = {
-                'barang_masuk': {
-                    'total': 0,
-                    'history': {}
-                },
-                'barang_keluar': {
-                    'total': 0,
-                    'history': {}
-                },
-                'ringkasan': {
-                    'total_masuk': 0,
-                    'total_keluar': 0,
-                    'sisa_barang': 0,
-                    'last_update': datetime.now().isoformat()
-                }
-            }
+            if self.counter_shard:
+                tambah(f"penghitung/{kunci_aman(hasil['stasiun'] or '_awal')}/{mode}", -1)
+            else:
+                tambah(f"barang_{mode}/total", -1)
+                tambah(f"ringkasan/total_{mode}", -1)
+                tambah('ringkasan/sisa_barang', -1 if mode == 'masuk' else 1)
             
-            self.db.set(initial_data)
-            print("✅ Database berhasil direset")
-            return True
+            if hasil['timestamp_ms'] is not None:
+                for resolusi in FORMAT_ROLLUP:
+                    tambah(f"rollups/{resolusi}/{kunci_rollup(hasil['timestamp_ms'], resolusi)}/{mode}", -1)
             
-        except Exception as e:
-            print(f"❌ Error reset database: {e}")
-            return False
+            if hasil['qr_data'] is not None:
+                tambah(f"stok/{kunci_aman(hasil['qr_data'])}/jumlah", -1 if mode == 'masuk' else 1)
+        
+        for path_counter, n in kurang.items():
+            if n:
+                update[path_counter] = {'.sv': {'increment': n}}
+        if not self.counter_shard:
+            update['ringkasan/last_update'] = datetime.now().isoformat()
+        return update
 
 class QRCodeDetector:
-    def __init__(self, firebase_credential_path, firebase_database_url):
-        # Inisialisasi Firebase Manager
-        self.firebase = FirebaseManager(firebase_credential_path, firebase_database_url)
+    # Warna indikator per status koneksi Firebase
+    WARNA_KONEKSI = {
+        'aktif': (0, 255, 0),
+        'menghubungkan': (0, 255, 255),
+        'offline': (0, 0, 255)
+    }
+    
+    def __init__(self, firebase_credential_path, firebase_database_url, firebase_options=None,
+                 stok_path=None, katalog_path=None, counter_path=None):
+        # Inisialisasi Firebase Manager (opsi tambahan diteruskan ke FirebaseManager)
+        self.firebase = FirebaseManager(firebase_credential_path, firebase_database_url,
+                                        **(firebase_options or {}))
+        
+        # Log event (antrean, tanpa I/O di loop frame)
+        self.log = log_event.default()
         
         # Inisialisasi detektor QR code
         self.qr_detector = cv2.QRCodeDetector()
@@ -211,9 +1006,17 @@ class QRCodeDetector:
         # Mode tracking: 'masuk' atau 'keluar'
         self.tracking_mode = 'masuk'  # Default mode masuk
         
-        # Counter untuk jumlah barang
-        self.count_masuk = 0
-        self.count_keluar = 0
+        # Counter untuk jumlah barang = total server + scan di outbox - offset tombol R.
+        # Total server mulai dari snapshot lokal, lalu diikuti dari ringkasan Firebase lewat
+        # listener (tanpa menunda kamera); scan baru hanya menambah outbox, jadi listener dan
+        # loop frame tidak pernah menulis nilai yang sama
+        self.counter_server = {'masuk': 0, 'keluar': 0}
+        self.counter_offset = {'masuk': 0, 'keluar': 0}
+        self.counter_lock = threading.Lock()
+        self.counter_path = counter_path
+        self.counter_sinkron = False
+        self.muat_counter()
+        self.firebase.ikuti_ringkasan(self.sinkron_counter)
         
         # History untuk mencegah deteksi berulang dalam waktu singkat
         self.detection_history = {}
@@ -233,7 +1036,41 @@ class QRCodeDetector:
         # Parameter tracking
         self.min_detection_gap = 0.5  # Minimal 0.5 detik antara deteksi QR yang sama
         self.display_time = 3.0  # Tampilkan selama 3 detik
-        
+
+        # Hasil render panel terakhir, dipakai ulang saat overlay tidak di-refresh
+        self.panel_cache = None
+
+        # Cache teks label dan ukurannya per payload QR
+        self.label_cache = {}
+        self.label_cache_max = 1024
+
+        # Tracker antar frame: setiap lintasan fisik QR dihitung sekali per track
+        self.use_tracker = True
+        self.tracker = QRTracker()
+
+        # Latensi end-to-end per scan, dari capture sampai acknowledgment database
+        self.latency = LatencyTracker()
+
+        # Stok per barang (snapshot + delta di stok_path), dan barang terakhir untuk panel
+        self.stok = IndeksStok(stok_path)
+        self.stok_terakhir = None
+
+        # Katalog barang lokal (CSV/SQLite) untuk nama barang di overlay, dimuat sekali di sini
+        self.katalog = KatalogBarang(katalog_path)
+
+        # Event bus: process_qr hanya publish event 'scan'; Firebase dan stok tidak boleh
+        # kehilangan event, jadi antreannya tanpa batas (memori, bukan loop frame, yang menampung)
+        self.bus = EventBus()
+        self.bus.subscribe('scan', 'firebase', self.sink_firebase, kebijakan='tanpa_batas')
+        self.bus.subscribe('scan', 'stok', self.sink_stok, kebijakan='tanpa_batas')
+
+        # Decode paralel (opsional): deteksi semua QR dulu, lalu decode tiap patch di thread pool;
+        # bawaan tetap satu decode per frame
+        self.parallel_decode = False
+        self.decode_workers = os.cpu_count() or 1
+        self.decode_pool = None
+        self.thread_local = threading.local()
+
     def decode_qr(self, frame):
         """Mendeteksi dan mendecode QR code dari frame"""
         try:
@@ -249,6 +1086,173 @@ class QRCodeDetector:
         
         return None, None
     
+    def decode_frame(self, frame):
+        """Decode semua QR di frame, return list (qr_data, bbox)"""
+        if self.parallel_decode:
+            return self.decode_qr_multi(frame)
+        
+        qr_data, bbox = self.decode_qr(frame)
+        return [(qr_data, bbox)] if qr_data and bbox is not None else []
+    
+    def decode_qr_multi(self, frame):
+        """Deteksi semua kandidat QR, lalu rectify dan decode tiap patch secara paralel"""
+        try:
+            found, points = self.qr_detector.detectMulti(frame)
+        except Exception as e:
+            return []
+        
+        if not found or points is None:
+            return []
+        
+        quads = points.reshape(-1, 4, 2).astype(np.float32)
+        
+        # Urutan deterministik: atas ke bawah, lalu kiri ke kanan
+        centers = quads.mean(axis=1)
+        quads = quads[np.lexsort((centers[:, 0], centers[:, 1]))]
+        
+        if len(quads) == 1 or self.decode_workers <= 1:
+            decoded = [self.decode_patch(frame, quad) for quad in quads]
+        else:
+            if self.decode_pool is None:
+                self.decode_pool = ThreadPoolExecutor(max_workers=self.decode_workers,
+                                                      thread_name_prefix='qr-decode')
+            # map mempertahankan urutan input
+            decoded = list(self.decode_pool.map(self.decode_patch, [frame] * len(quads), quads))
+        
+        return [(data, quad.astype(int).reshape(1, 4, 2))
+                for data, quad in zip(decoded, quads) if data]
+    
+    def decode_patch(self, frame, quad):
+        """Rectify satu kandidat QR menjadi patch persegi lalu decode"""
+        # Detektor OpenCV tidak thread-safe, jadi satu instance per thread
+        detector = getattr(self.thread_local, 'detector', None)
+        if detector is None:
+            detector = cv2.QRCodeDetector()
+            self.thread_local.detector = detector
+        
+        try:
+            # Ukuran patch mengikuti sisi terpanjang quad, dengan margin sebagai quiet zone
+            side = np.linalg.norm(quad - np.roll(quad, -1, axis=0), axis=1).max()
+            size = int(np.clip(side, 64, 512))
+            margin = size // 8
+            target = np.array([[margin, margin],
+                               [margin + size, margin],
+                               [margin + size, margin + size],
+                               [margin, margin + size]], dtype=np.float32)
+            
+            matrix = cv2.getPerspectiveTransform(quad, target)
+            patch = cv2.warpPerspective(frame, matrix, (size + 2 * margin, size + 2 * margin),
+                                        borderValue=(255, 255, 255))
+            
+            # Posisi sudut di patch sudah diketahui, jadi deteksi ulang tidak perlu
+            data, _ = detector.decode(patch, target.reshape(1, 4, 2))
+            if not data:
+                data, _, _ = detector.detectAndDecode(patch)
+            
+            return data.strip() if data else None
+        except Exception as e:
+            return None
+    
+    def sink_firebase(self, event):
+        """Sink bus: kirim outbox ke Firebase dan catat latensi sampai acknowledgment"""
+        waktu = event['waktu']
+        ack = self.firebase.kirim_event(event['outbox'])
+        if ack:
+            waktu['ack'] = time.time()
+        self.latency.catat(waktu)
+    
+    def sink_stok(self, event):
+        """Sink bus: perbarui indeks stok per barang"""
+        self.stok.catat(event['qr'], event['mode'], int(event['waktu']['proses'] * 1000))
+    
+    def tutup(self):
+        """Bebaskan resource yang dipakai detektor"""
+        self.bus.tutup()
+        if self.decode_pool is not None:
+            self.decode_pool.shutdown(wait=False)
+            self.decode_pool = None
+        self.stok.tutup()
+        self.katalog.tutup()
+        self.firebase.hentikan_ringkasan()
+        self.simpan_counter()
+    
+    def muat_counter(self):
+        """Isi counter dari snapshot lokal terakhir (jika ada)"""
+        if not self.counter_path or not os.path.exists(self.counter_path):
+            return
+        try:
+            with open(self.counter_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            with self.counter_lock:
+                self.counter_server = {'masuk': snapshot.get('masuk', 0),
+                                       'keluar': snapshot.get('keluar', 0)}
+        except Exception as e:
+            print(f"⚠ Snapshot counter tidak bisa dibaca: {e}")
+    
+    def simpan_counter(self):
+        """
+        Simpan total server terakhir sebagai snapshot untuk startup berikutnya
+        
+        Scan yang belum terkirim tidak ikut disimpan karena akan dimuat lagi dari journal.
+        """
+        if not self.counter_path:
+            return
+        with self.counter_lock:
+            server = dict(self.counter_server)
+        try:
+            tmp = self.counter_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'masuk': server['masuk'], 'keluar': server['keluar'],
+                           'waktu': datetime.now().isoformat()}, f)
+            os.replace(tmp, self.counter_path)
+        except Exception as e:
+            print(f"⚠ Snapshot counter tidak bisa disimpan: {e}")
+    
+    def sinkron_counter(self, total_masuk, total_keluar):
+        """Callback listener ringkasan: perbarui total server"""
+        with self.counter_lock:
+            self.counter_server = {'masuk': total_masuk, 'keluar': total_keluar}
+            self.counter_sinkron = True
+    
+    def counter(self):
+        """
+        Counter tampilan (masuk, keluar)
+        
+        Batch yang sedang dikirim tetap dihitung sebagai tertunda. Jika event listener untuk
+        batch itu datang sebelum batch keluar dari outbox, counter sesaat lebih tinggi; jika
+        datang sesudahnya, sesaat lebih rendah. Keduanya terkoreksi sendiri dalam hitungan
+        milidetik, tanpa ada scan yang hilang.
+        """
+        tertunda = self.firebase.jumlah_tertunda()
+        with self.counter_lock:
+            return (self.counter_server['masuk'] + tertunda['masuk'] - self.counter_offset['masuk'],
+                    self.counter_server['keluar'] + tertunda['keluar'] - self.counter_offset['keluar'])
+    
+    @property
+    def count_masuk(self):
+        return self.counter()[0]
+    
+    @property
+    def count_keluar(self):
+        return self.counter()[1]
+    
+    def nolkan_counter(self):
+        """Tombol R: counter tampilan mulai dari nol untuk sesi ini (total Firebase tidak berubah)"""
+        masuk, keluar = self.counter()
+        with self.counter_lock:
+            self.counter_offset['masuk'] += masuk
+            self.counter_offset['keluar'] += keluar
+    
+    def counter_setelah_reset(self):
+        """
+        Tombol F: hapus offset tombol R
+        
+        Total server turun bertahap selama history dihapus dan diikuti lewat listener
+        ringkasan, jadi counter_server tidak dinolkan di sini.
+        """
+        with self.counter_lock:
+            self.counter_offset = {'masuk': 0, 'keluar': 0}
+    
     def can_detect_qr(self, qr_data, timestamp):
         """Cek apakah QR code boleh dideteksi lagi"""
         if not qr_data:
@@ -265,9 +1269,30 @@ class QRCodeDetector:
             
         return False
     
-    def process_qr(self, qr_data, bbox, timestamp):
-        """Proses QR code berdasarkan mode tracking"""
-        if not qr_data or not self.can_detect_qr(qr_data, timestamp):
+    def process_detections(self, detections, timestamp, waktu=None):
+        """Asosiasikan deteksi frame ini ke track lalu proses setiap QR"""
+        updated = False
+        for track_id, qr_data, bbox in self.tracker.update(detections, timestamp):
+            updated = self.process_qr(qr_data, bbox, timestamp, track_id=track_id, waktu=waktu) or updated
+        return updated
+
+    def process_qr(self, qr_data, bbox, timestamp, track_id=None, waktu=None):
+        """
+        Proses QR code berdasarkan mode tracking
+
+        Args:
+            qr_data: Isi QR code
+            bbox: Titik sudut QR (1, 4, 2)
+            timestamp: Waktu frame
+            track_id: ID track dari QRTracker (None: deduplikasi berbasis waktu)
+            waktu: Timestamp tahap sebelumnya ('capture', 'decode_mulai', 'decode_selesai')
+                untuk pengukuran latensi end-to-end
+        """
+        if not qr_data:
+            return False
+
+        # Tanpa track ID, deduplikasi memakai jeda minimal antar deteksi
+        if track_id is None and not self.can_detect_qr(qr_data, timestamp):
             return False
         
         # Update history deteksi
@@ -295,18 +1320,40 @@ class QRCodeDetector:
             updated = True
         
         # Update counter berdasarkan mode dan kirim ke Firebase
+        # (dengan tracker: sekali per track, tanpa tracker: sekali per QR per mode)
         history_key = f"{qr_data}_{self.tracking_mode}"
-        if history_key not in self.detection_history:
+        if track_id is not None:
+            perlu_dihitung = self.tracker.tandai_dihitung(track_id)
+        else:
+            perlu_dihitung = history_key not in self.detection_history
+
+        if perlu_dihitung:
+            waktu = dict(waktu) if waktu else {'capture': timestamp}
+            waktu['proses'] = time.time()
+            
+            self.stok_terakhir = qr_data
+            
             if self.tracking_mode == 'masuk':
-                self.count_masuk += 1
-                print(f"📥 BARANG MASUK: {qr_data}")
-                # Kirim ke Firebase
-                self.firebase.send_barang_masuk(qr_data)
+                self.log.info('scan', f"📥 BARANG MASUK: {qr_data}", mode='masuk', qr=qr_data,
+                              track=track_id)
             else:
-                self.count_keluar += 1
-                print(f"📤 BARANG KELUAR: {qr_data}")
-                # Kirim ke Firebase
-                self.firebase.send_barang_keluar(qr_data)
+                self.log.info('scan', f"📤 BARANG KELUAR: {qr_data}", mode='keluar', qr=qr_data,
+                              track=track_id)
+            
+            # Scan masuk outbox dan journal di sini, sinkron di thread frame (tanpa jaringan dan
+            # tanpa fsync), jadi tidak hilang walaupun program berhenti sebelum sink sempat
+            # memprosesnya; journal bukan sink bus, sink Firebase hanya mengirim
+            outbox = self.firebase.catat_scan(self.tracking_mode, qr_data,
+                                              datetime.fromtimestamp(waktu['proses']))
+            
+            # Firebase, stok, dan konsumen lain memproses event di thread sink masing-masing
+            self.bus.publish('scan', {
+                'qr': qr_data,
+                'mode': self.tracking_mode,
+                'track': track_id,
+                'waktu': waktu,
+                'outbox': outbox
+            })
             
             self.detection_history[history_key] = timestamp
         
@@ -330,50 +1377,62 @@ class QRCodeDetector:
                 if time_diff > self.min_detection_gap * 3:
                     del self.detection_history[qr_data]
     
-    def draw_detection(self, frame, qr_data, bbox, mode):
-        """Menggambar bounding box dan informasi pada frame"""
-        color = self.COLORS[mode]
-        
-        # Gambar bounding box
-        n = len(bbox[0])
-        for i in range(n):
-            cv2.line(frame, tuple(bbox[0][i]), tuple(bbox[0][(i+1) % n]), color, 3)
-        
-        # Gambar titik sudut
-        for point in bbox[0]:
-            cv2.circle(frame, tuple(point), 6, (255, 255, 255), -1)
-        
-        # Hitung posisi untuk teks
-        box_center_x = int(np.mean([p[0] for p in bbox[0]]))
-        box_center_y = int(np.mean([p[1] for p in bbox[0]]))
-        
-        # Potong teks jika terlalu panjang
-        display_text = qr_data[:15] + "..." if len(qr_data) > 15 else qr_data
-        
-        # Background untuk teks
-        text = f"{display_text}"
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-        
-        # Posisi teks di atas bounding box
-        text_x = box_center_x - text_size[0] // 2
-        text_y = box_center_y - 15
+    def label_metrics(self, qr_data):
+        """Teks label dan ukurannya untuk payload QR, disimpan di cache"""
+        metrics = self.label_cache.get(qr_data)
+        if metrics is None:
+            if len(self.label_cache) >= self.label_cache_max:
+                self.label_cache.clear()
+            
+            # Nama barang dari katalog (atau isi QR), dipotong jika terlalu panjang
+            text = self.katalog.label(qr_data, 15)
+            text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+            metrics = (text, text_size)
+            self.label_cache[qr_data] = metrics
+        return metrics
+    
+    def draw_detections(self, frame):
+        """Menggambar bounding box dan label semua QR aktif sekaligus"""
+        items = [(qr_data, info) for qr_data, info in self.object_status.items() if 'bbox' in info]
+        if not items:
+            return frame
+        
+        # Semua quad dalam satu array (K, 4, 2)
+        quads = np.array([np.asarray(info['bbox']).reshape(4, 2) for _, info in items], dtype=np.int32)
+        modes = np.array([info['mode'] for _, info in items])
+        
+        # Bounding box: satu panggilan polylines per warna mode
+        for mode in ('masuk', 'keluar'):
+            mask = modes == mode
+            if mask.any():
+                cv2.polylines(frame, quads[mask], True, self.COLORS[mode], 3)
+        
+        # Titik sudut: garis nol-panjang dengan ketebalan 12 sama dengan lingkaran radius 6
+        corners = np.repeat(quads.reshape(-1, 1, 2), 2, axis=1)
+        cv2.polylines(frame, corners, False, (255, 255, 255), 12)
+        
+        # Posisi label untuk semua QR sekaligus
+        labels = [self.label_metrics(qr_data) for qr_data, _ in items]
+        sizes = np.array([size for _, size in labels], dtype=np.int32)
+        centers = quads.mean(axis=1).astype(np.int32)
+        text_pos = np.stack([centers[:, 0] - sizes[:, 0] // 2, centers[:, 1] - 15], axis=1)
         
-        # Background box untuk teks (rounded corners)
         padding = 5
-        cv2.rectangle(frame, 
-                     (text_x - padding, text_y - text_size[1] - padding),
-                     (text_x + text_size[0] + padding, text_y + padding),
-                     color, -1)
-        
-        # Border untuk text box
-        cv2.rectangle(frame, 
-                     (text_x - padding, text_y - text_size[1] - padding),
-                     (text_x + text_size[0] + padding, text_y + padding),
-                     (255, 255, 255), 1)
+        top_left = np.stack([text_pos[:, 0] - padding, text_pos[:, 1] - sizes[:, 1] - padding], axis=1)
+        bottom_right = np.stack([text_pos[:, 0] + sizes[:, 0] + padding, text_pos[:, 1] + padding], axis=1)
         
-        # Teks QR data
-        cv2.putText(frame, text, (text_x, text_y), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        for i, (text, _) in enumerate(labels):
+            color = self.COLORS[modes[i]]
+            p1 = (int(top_left[i, 0]), int(top_left[i, 1]))
+            p2 = (int(bottom_right[i, 0]), int(bottom_right[i, 1]))
+            
+            # Background dan border untuk teks
+            cv2.rectangle(frame, p1, p2, color, -1)
+            cv2.rectangle(frame, p1, p2, (255, 255, 255), 1)
+            
+            # Teks QR data
+            cv2.putText(frame, text, (int(text_pos[i, 0]), int(text_pos[i, 1])), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         return frame
     
@@ -405,7 +1464,7 @@ class QRCodeDetector:
         title_x = panel_x + (panel_width - title_size[0]) // 2
         
         # Indikator status Firebase - lebih sederhana tanpa teks tambahan
-        firebase_color = (0, 255, 0) if self.firebase.db else (0, 0, 255)
+        firebase_color = self.WARNA_KONEKSI[self.firebase.status_koneksi]
         
         # Gambar lingkaran indikator kecil di pojok kiri header
         indicator_radius = 8
@@ -566,7 +1625,7 @@ class QRCodeDetector:
         y_offset += counter_panel_height + 15
         
         # ==================== PANEL INFORMASI SISTEM ====================
-        info_panel_height = 120
+        info_panel_height = 160
         cv2.rectangle(frame, 
                      (panel_x + 10, y_offset), 
                      (panel_x + panel_width - 10, y_offset + info_panel_height),
@@ -585,8 +1644,13 @@ class QRCodeDetector:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 255, 200), 1)
         
         # Firebase Status (dipindahkan ke panel informasi sistem)
-        firebase_status = "Firebase: AKTIF" if self.firebase.db else "Firebase: OFFLINE"
-        firebase_color = (0, 255, 0) if self.firebase.db else (0, 0, 255)
+        firebase_status = f"Firebase: {self.firebase.status_koneksi.upper()}"
+        firebase_color = self.WARNA_KONEKSI[self.firebase.status_koneksi]
+        if self.firebase.status_koneksi == 'menghubungkan' and self.firebase.pending:
+            firebase_status += f" ({len(self.firebase.pending)} antre)"
+        if self.firebase.reset_status['aktif']:
+            firebase_status = f"Reset: {self.firebase.reset_status['terhapus']} record dihapus"
+            firebase_color = (255, 100, 100)
         cv2.putText(frame, firebase_status, (panel_x + 30, y_offset + 90), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, firebase_color, 1)
         
@@ -597,6 +1661,18 @@ class QRCodeDetector:
         cv2.putText(frame, status_text, (panel_x + 30, y_offset + 110), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, status_color, 1)
         
+        # Latensi end-to-end (capture sampai tersimpan di database)
+        p50, p95, p99 = self.latency.persentil('total')
+        latency_text = f"Latensi p50/95/99: {p50:.0f}/{p95:.0f}/{p99:.0f} ms"
+        cv2.putText(frame, latency_text, (panel_x + 30, y_offset + 130), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 220, 180), 1)
+        
+        # Stok barang yang terakhir discan (dari indeks stok, tanpa membaca history)
+        if self.stok_terakhir is not None:
+            stok_text = f"Stok {self.katalog.label(self.stok_terakhir, 18)}: {self.stok.stok(self.stok_terakhir)}"
+            cv2.putText(frame, stok_text, (panel_x + 30, y_offset + 150), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 255, 255), 1)
+        
         y_offset += info_panel_height + 15
         
         # ==================== PANEL KONTROL ====================
@@ -667,8 +1743,8 @@ class QRCodeDetector:
                 mode = info['mode']
                 color = self.COLORS[mode]
                 
-                # Potong teks
-                display_text = qr_data[:12] + "..." if len(qr_data) > 12 else qr_data
+                # Nama barang dari katalog (atau isi QR), dipotong
+                display_text = self.katalog.label(qr_data, 12)
                 
                 # Bullet point
                 cv2.circle(frame, (panel_x + 25, qr_y - 5), 3, color, -1)
@@ -682,22 +1758,920 @@ class QRCodeDetector:
         
         return frame
     
+    def draw_control_panel_cached(self, frame, refresh=True):
+        """Gambar panel kontrol, atau tempel hasil render terakhir jika tidak perlu refresh"""
+        panel_width = 350
+
+        # Panel menimpa seluruh area kanan, jadi hasilnya tidak bergantung isi kamera
+        if refresh or self.panel_cache is None or self.panel_cache.shape[0] != frame.shape[0]:
+            frame = self.draw_control_panel_right(frame)
+            self.panel_cache = frame[:, -panel_width:].copy()
+        else:
+            frame[:, -panel_width:] = self.panel_cache
+
+        return frame
+
     def clear_detection_history(self):
         """Clear detection history agar QR bisa dideteksi lagi"""
         self.detection_history.clear()
         self.object_status.clear()
         print("History deteksi dan status telah dibersihkan")
 
+class QRTracker:
+    def __init__(self, iou_threshold=0.2, max_centroid_distance=0.75, max_miss=5, track_timeout=5.0):
+        """
+        Tracker multi-objek sederhana untuk mengasosiasikan QR antar frame
+
+        Track berakhir setelah max_miss decode berturut-turut tanpa QR tersebut. Miss hanya
+        dihitung pada frame yang benar-benar di-decode (update() hanya dipanggil saat decode
+        berjalan), jadi frame yang dilewati governor tidak mengakhiri track, sedangkan label
+        yang keluar lalu masuk lagi dengan cepat tetap dihitung sebagai lintasan baru.
+
+        Args:
+            iou_threshold: IoU minimal agar deteksi dianggap QR yang sama
+            max_centroid_distance: Jarak centroid maksimal, relatif terhadap diagonal bbox track
+            max_miss: Jumlah decode berturut-turut tanpa deteksi sebelum track berakhir
+            track_timeout: Batas cadangan (detik) jika decode berhenti sama sekali
+        """
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_miss = max_miss
+        self.track_timeout = track_timeout
+
+        # State track disimpan sebagai array agar asosiasi bisa divektorisasi
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.quads = np.zeros((0, 4, 2), dtype=np.float32)
+        self.payloads = np.zeros(0, dtype=object)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+        self.miss = np.zeros(0, dtype=np.int32)
+        self.counted = np.zeros(0, dtype=bool)
+
+        self.next_id = 1
+
+    def simpan_track(self, alive):
+        """Pertahankan hanya track dengan alive=True"""
+        if alive.all():
+            return
+        self.ids = self.ids[alive]
+        self.quads = self.quads[alive]
+        self.payloads = self.payloads[alive]
+        self.last_seen = self.last_seen[alive]
+        self.miss = self.miss[alive]
+        self.counted = self.counted[alive]
+
+    @staticmethod
+    def kotak(quads):
+        """Bounding box sejajar sumbu [x1, y1, x2, y2] untuk array quad (N, 4, 2)"""
+        return np.concatenate([quads.min(axis=1), quads.max(axis=1)], axis=1)
+
+    def matriks_biaya(self, det_quads, det_payloads):
+        """Matriks biaya asosiasi (deteksi x track), np.inf untuk pasangan yang tidak valid"""
+        d_box = self.kotak(det_quads)[:, None, :]
+        t_box = self.kotak(self.quads)[None, :, :]
+
+        # IoU semua pasangan sekaligus
+        ix = np.clip(np.minimum(d_box[..., 2], t_box[..., 2]) - np.maximum(d_box[..., 0], t_box[..., 0]), 0, None)
+        iy = np.clip(np.minimum(d_box[..., 3], t_box[..., 3]) - np.maximum(d_box[..., 1], t_box[..., 1]), 0, None)
+        inter = ix * iy
+        d_area = (d_box[..., 2] - d_box[..., 0]) * (d_box[..., 3] - d_box[..., 1])
+        t_area = (t_box[..., 2] - t_box[..., 0]) * (t_box[..., 3] - t_box[..., 1])
+        iou = inter / np.maximum(d_area + t_area - inter, 1e-6)
+
+        # Jarak centroid dinormalisasi dengan diagonal bbox track
+        d_center = det_quads.mean(axis=1)[:, None, :]
+        t_center = self.quads.mean(axis=1)[None, :, :]
+        t_diag = np.hypot(t_box[..., 2] - t_box[..., 0], t_box[..., 3] - t_box[..., 1])
+        dist = np.linalg.norm(d_center - t_center, axis=2) / np.maximum(t_diag, 1.0)
+
+        same_payload = det_payloads[:, None] == self.payloads[None, :]
+        valid = same_payload & ((iou >= self.iou_threshold) | (dist <= self.max_centroid_distance))
+
+        return np.where(valid, (1.0 - iou) + dist, np.inf)
+
+    def update(self, detections, timestamp):
+        """
+        Asosiasikan deteksi frame ini dengan track yang ada
+
+        Args:
+            detections: List (qr_data, bbox) hasil decode frame ini
+            timestamp: Waktu frame
+
+        Returns:
+            List (track_id, qr_data, bbox) dengan urutan sama seperti detections
+        """
+        # Cadangan: hapus track yang sudah lama tidak terlihat walaupun miss belum penuh
+        self.simpan_track(timestamp - self.last_seen <= self.track_timeout)
+
+        if not detections:
+            self.miss += 1
+            self.simpan_track(self.miss < self.max_miss)
+            return []
+
+        det_quads = np.array([np.asarray(bbox, dtype=np.float32).reshape(4, 2) for _, bbox in detections])
+        det_payloads = np.empty(len(detections), dtype=object)
+        det_payloads[:] = [qr_data for qr_data, _ in detections]
+
+        # Greedy matching: pasangan dengan biaya terkecil dipilih lebih dulu
+        assigned = np.full(len(detections), -1, dtype=np.int64)
+        if len(self.ids):
+            cost = self.matriks_biaya(det_quads, det_payloads)
+            used_tracks = set()
+            for flat in np.argsort(cost, axis=None):
+                di, ti = np.unravel_index(flat, cost.shape)
+                if not np.isfinite(cost[di, ti]):
+                    break
+                if assigned[di] >= 0 or ti in used_tracks:
+                    continue
+                assigned[di] = ti
+                used_tracks.add(ti)
+
+        matched = assigned >= 0
+        terlihat = np.zeros(len(self.ids), dtype=bool)
+        terlihat[assigned[matched]] = True
+        if matched.any():
+            self.quads[assigned[matched]] = det_quads[matched]
+            self.last_seen[assigned[matched]] = timestamp
+        self.miss = np.where(terlihat, 0, self.miss + 1).astype(np.int32)
+
+        # Deteksi tanpa pasangan menjadi track baru (satu lintasan fisik baru)
+        new_idx = np.flatnonzero(~matched)
+        if len(new_idx):
+            new_ids = np.arange(self.next_id, self.next_id + len(new_idx))
+            self.next_id += len(new_idx)
+            assigned[new_idx] = len(self.ids) + np.arange(len(new_idx))
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.quads = np.concatenate([self.quads, det_quads[new_idx]])
+            self.payloads = np.concatenate([self.payloads, det_payloads[new_idx]])
+            self.last_seen = np.concatenate([self.last_seen, np.full(len(new_idx), timestamp)])
+            self.miss = np.concatenate([self.miss, np.zeros(len(new_idx), dtype=np.int32)])
+            self.counted = np.concatenate([self.counted, np.zeros(len(new_idx), dtype=bool)])
+
+        hasil = [(int(self.ids[ti]), qr_data, bbox)
+                 for ti, (qr_data, bbox) in zip(assigned, detections)]
+
+        # Track yang tidak terlihat di decode ini menambah miss; yang penuh berakhir
+        self.simpan_track(self.miss < self.max_miss)
+        return hasil
+
+    def tandai_dihitung(self, track_id):
+        """Tandai track sudah dihitung; return False jika sudah pernah dihitung"""
+        idx = np.flatnonzero(self.ids == track_id)
+        if not len(idx) or self.counted[idx[0]]:
+            return False
+        self.counted[idx[0]] = True
+        return True
+
+class LatencyTracker:
+    # Tahap latensi: (nama, timestamp awal, timestamp akhir)
+    TAHAP = [
+        ('antri', 'capture', 'decode_mulai'),
+        ('decode', 'decode_mulai', 'decode_selesai'),
+        ('proses', 'decode_selesai', 'proses'),
+        ('database', 'proses', 'ack'),
+        ('total', 'capture', 'ack')
+    ]
+
+    def __init__(self, window=500, max_sesi=100000):
+        """
+        Pencatat latensi scan end-to-end per tahap
+
+        Args:
+            window: Jumlah event terakhir untuk persentil bergulir di panel
+            max_sesi: Batas jumlah sampel yang disimpan untuk laporan sesi
+        """
+        self.window = {nama: deque(maxlen=window) for nama, _, _ in self.TAHAP}
+        self.sesi = {nama: deque(maxlen=max_sesi) for nama, _, _ in self.TAHAP}
+        self.jumlah_event = 0
+        self.jumlah_gagal = 0
+
+        # Cache persentil agar panel tidak mengurutkan data setiap frame
+        self.cache = {}
+        self.cache_waktu = 0.0
+
+        # catat() dipanggil dari thread sink, persentil() dari loop frame
+        self.lock = threading.Lock()
+
+    def catat(self, waktu):
+        """Catat satu event; waktu berisi timestamp per tahap (detik epoch)"""
+        with self.lock:
+            self.jumlah_event += 1
+            if 'ack' not in waktu:
+                self.jumlah_gagal += 1
+
+            for nama, awal, akhir in self.TAHAP:
+                if awal in waktu and akhir in waktu:
+                    durasi_ms = max(0.0, (waktu[akhir] - waktu[awal]) * 1000)
+                    self.window[nama].append(durasi_ms)
+                    self.sesi[nama].append(durasi_ms)
+
+    @staticmethod
+    def hitung_persentil(data, ps=(50, 95, 99)):
+        """Persentil dari sekumpulan data (nearest-rank)"""
+        if not data:
+            return tuple(0.0 for _ in ps)
+        urut = sorted(data)
+        return tuple(urut[min(len(urut) - 1, int(round(p / 100.0 * (len(urut) - 1))))] for p in ps)
+
+    def persentil(self, tahap):
+        """p50, p95, p99 bergulir (ms) untuk satu tahap, di-cache 0.5 detik"""
+        sekarang = time.time()
+        if sekarang - self.cache_waktu > 0.5:
+            with self.lock:
+                data = {nama: list(window) for nama, window in self.window.items()}
+            self.cache = {nama: self.hitung_persentil(nilai) for nama, nilai in data.items()}
+            self.cache_waktu = sekarang
+        return self.cache.get(tahap, (0.0, 0.0, 0.0))
+
+    def laporan(self):
+        """Ringkasan latensi seluruh sesi per tahap"""
+        hasil = {
+            'jumlah_event': self.jumlah_event,
+            'jumlah_gagal': self.jumlah_gagal,
+            'tahap': {}
+        }
+        for nama, data in self.sesi.items():
+            p50, p95, p99 = self.hitung_persentil(data)
+            hasil['tahap'][nama] = {
+                'jumlah': len(data),
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': max(data) if data else 0.0
+            }
+        return hasil
+
+    def simpan_laporan(self, path, info_tambahan=None):
+        """Simpan laporan sesi ke file JSON"""
+        laporan = self.laporan()
+        if info_tambahan:
+            laporan.update(info_tambahan)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(laporan, f, indent=2)
+            print(f"✅ Laporan latensi sesi disimpan: {path}")
+        except OSError as e:
+            print(f"❌ Gagal menyimpan laporan latensi: {e}")
+        return laporan
+
+class IndeksStok:
+    def __init__(self, snapshot_path=None, compact_setelah=5000):
+        """
+        Indeks stok per barang (per isi QR) di memori
+        
+        Setiap scan memperbarui satu entri dalam O(1). Di disk, indeks disimpan sebagai
+        snapshot ringkas ditambah file delta (satu baris per scan) yang dipadatkan kembali
+        ke snapshot setelah compact_setelah baris.
+        
+        Args:
+            snapshot_path: File snapshot JSON; delta ditulis ke <snapshot_path>.delta.
+                None untuk indeks di memori saja
+            compact_setelah: Jumlah delta sebelum snapshot ditulis ulang
+        """
+        self.snapshot_path = snapshot_path
+        self.delta_path = snapshot_path + '.delta' if snapshot_path else None
+        self.compact_setelah = compact_setelah
+        
+        # qr_data -> [stok, total masuk, total keluar, waktu terakhir (ms), mode terakhir]
+        self.items = {}
+        self.jumlah_delta = 0
+        self.delta_file = None
+        self.lock = threading.Lock()
+        
+        if snapshot_path:
+            self.muat()
+    
+    def muat(self):
+        """Muat snapshot lalu terapkan delta yang belum dipadatkan"""
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    self.items = json.load(f).get('stok', {})
+            except Exception as e:
+                print(f"⚠ Snapshot stok tidak bisa dibaca: {e}")
+                self.items = {}
+        
+        if os.path.exists(self.delta_path):
+            with open(self.delta_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        qr_data, mode, timestamp_ms = json.loads(line)
+                    except ValueError:
+                        # Baris terakhir bisa terpotong jika program berhenti mendadak
+                        continue
+                    self.terapkan(qr_data, mode, timestamp_ms)
+                    self.jumlah_delta += 1
+    
+    def terapkan(self, qr_data, mode, timestamp_ms):
+        """Perbarui entri satu barang"""
+        item = self.items.get(qr_data)
+        if item is None:
+            item = self.items[qr_data] = [0, 0, 0, 0, mode]
+        if mode == 'masuk':
+            item[0] += 1
+            item[1] += 1
+        else:
+            item[0] -= 1
+            item[2] += 1
+        item[3] = timestamp_ms
+        item[4] = mode
+    
+    def catat(self, qr_data, mode, timestamp_ms=None):
+        """Catat satu scan ke indeks dan ke file delta"""
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        
+        with self.lock:
+            self.terapkan(qr_data, mode, timestamp_ms)
+            
+            if not self.delta_path:
+                return
+            if self.delta_file is None:
+                self.delta_file = open(self.delta_path, 'a', encoding='utf-8')
+            self.delta_file.write(json.dumps([qr_data, mode, timestamp_ms], ensure_ascii=False,
+                                             separators=(',', ':')) + '\n')
+            self.delta_file.flush()
+            self.jumlah_delta += 1
+            
+            if self.jumlah_delta >= self.compact_setelah:
+                self.simpan_snapshot_locked()
+    
+    def simpan_snapshot(self):
+        """Tulis snapshot penuh dan kosongkan file delta"""
+        if not self.snapshot_path:
+            return
+        with self.lock:
+            self.simpan_snapshot_locked()
+    
+    def simpan_snapshot_locked(self):
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'v': 1, 't': int(time.time() * 1000), 'stok': self.items}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.snapshot_path)
+        
+        # Delta sudah tercakup snapshot
+        if self.delta_file is not None:
+            self.delta_file.close()
+            self.delta_file = None
+        open(self.delta_path, 'w').close()
+        self.jumlah_delta = 0
+    
+    def stok(self, qr_data):
+        """Stok satu barang saat ini (0 jika belum pernah discan)"""
+        item = self.items.get(qr_data)
+        return item[0] if item else 0
+    
+    def info(self, qr_data):
+        """Detail satu barang, atau None jika belum pernah discan"""
+        item = self.items.get(qr_data)
+        if item is None:
+            return None
+        return {
+            'stok': item[0],
+            'masuk': item[1],
+            'keluar': item[2],
+            'terakhir': datetime.fromtimestamp(item[3] / 1000.0),
+            'mode_terakhir': item[4]
+        }
+    
+    def reset(self):
+        """Kosongkan indeks beserta file di disk"""
+        with self.lock:
+            self.items = {}
+            if self.snapshot_path:
+                self.simpan_snapshot_locked()
+    
+    def tutup(self):
+        """Padatkan delta ke snapshot sebelum program berhenti"""
+        if self.snapshot_path and self.jumlah_delta:
+            self.simpan_snapshot()
+        elif self.delta_file is not None:
+            self.delta_file.close()
+            self.delta_file = None
+
+class FrameGovernor:
+    def __init__(self, target_fps=25, max_scan_latency=0.3, max_decode_interval=8,
+                 max_overlay_interval=6, ema_alpha=0.2, evaluasi_setiap=15):
+        """
+        Governor load-shedding untuk menjaga FPS tampilan dan latensi scan
+
+        Args:
+            target_fps: FPS tampilan yang ingin dipertahankan
+            max_scan_latency: Batas latensi scan (detik) dari label terlihat sampai selesai didecode
+            max_decode_interval: Decode paling jarang dijalankan tiap N frame
+            max_overlay_interval: Panel paling jarang digambar ulang tiap N frame
+            ema_alpha: Faktor smoothing pengukuran biaya per tahap
+            evaluasi_setiap: Keputusan dihitung ulang tiap N frame
+        """
+        self.target_fps = target_fps
+        self.max_scan_latency = max_scan_latency
+        self.max_decode_interval = max_decode_interval
+        self.max_overlay_interval = max_overlay_interval
+        self.ema_alpha = ema_alpha
+        self.evaluasi_setiap = evaluasi_setiap
+
+        # Biaya rata-rata per tahap dalam detik (EMA)
+        self.biaya = {
+            'capture': 0.0,   # Baca frame dari kamera
+            'decode': 0.0,    # Decode + proses QR, hanya pada frame yang didecode
+            'overlay': 0.0,   # Render panel, hanya pada frame yang di-refresh
+            'lainnya': 0.0    # Bounding box, imshow, waitKey, dll
+        }
+
+        # Keputusan aktif
+        self.decode_interval = 1
+        self.overlay_interval = 1
+        self.frame_index = 0
+
+        # Keputusan terakhir beserta estimasinya, untuk tuning
+        self.keputusan = {
+            'decode_interval': 1,
+            'overlay_interval': 1,
+            'est_fps': 0.0,
+            'est_latency': 0.0,
+            'alasan': 'awal'
+        }
+
+    def catat(self, tahap, durasi):
+        """Catat durasi (detik) satu tahap pada frame ini"""
+        sebelum = self.biaya[tahap]
+        if sebelum == 0.0:
+            self.biaya[tahap] = durasi
+        else:
+            self.biaya[tahap] = sebelum + self.ema_alpha * (durasi - sebelum)
+
+    def harus_decode(self):
+        """Cek apakah frame ini perlu didecode"""
+        return self.frame_index % self.decode_interval == 0
+
+    def harus_render_overlay(self):
+        """Cek apakah panel perlu digambar ulang pada frame ini"""
+        return self.frame_index % self.overlay_interval == 0
+
+    def akhir_frame(self):
+        """Dipanggil di akhir setiap frame"""
+        self.frame_index += 1
+        if self.frame_index % self.evaluasi_setiap == 0:
+            self.evaluasi()
+
+    def estimasi(self, decode_interval, overlay_interval):
+        """Estimasi periode frame dan latensi scan terburuk untuk kombinasi interval"""
+        base = self.biaya['capture'] + self.biaya['lainnya']
+        periode = (base
+                   + self.biaya['decode'] / decode_interval
+                   + self.biaya['overlay'] / overlay_interval)
+
+        # Label bisa muncul tepat setelah decode, jadi harus menunggu satu siklus penuh
+        periode_efektif = max(periode, 1.0 / self.target_fps)
+        latensi = decode_interval * periode_efektif + self.biaya['decode']
+        return periode, latensi
+
+    def evaluasi(self):
+        """Hitung ulang interval decode dan overlay dari biaya yang terukur"""
+        budget = 1.0 / self.target_fps
+        pilihan = None
+
+        # Urutan pencarian: decode sesering mungkin dulu, overlay yang dikorbankan lebih dulu
+        for nd in range(1, self.max_decode_interval + 1):
+            for no in range(1, self.max_overlay_interval + 1):
+                periode, latensi = self.estimasi(nd, no)
+                if periode <= budget and latensi <= self.max_scan_latency:
+                    pilihan = (nd, no, periode, latensi, 'target terpenuhi')
+                    break
+            if pilihan:
+                break
+
+        if pilihan is None:
+            # Target FPS tidak tercapai: overlay paling jarang, pilih decode dengan latensi terkecil
+            no = self.max_overlay_interval
+            kandidat = []
+            for nd in range(1, self.max_decode_interval + 1):
+                periode, latensi = self.estimasi(nd, no)
+                kandidat.append((latensi, nd, periode))
+            latensi, nd, periode = min(kandidat)
+            pilihan = (nd, no, periode, latensi, 'overload, latensi diprioritaskan')
+
+        nd, no, periode, latensi, alasan = pilihan
+        berubah = (nd, no) != (self.decode_interval, self.overlay_interval)
+
+        self.decode_interval = nd
+        self.overlay_interval = no
+        self.keputusan = {
+            'decode_interval': nd,
+            'overlay_interval': no,
+            'est_fps': 1.0 / periode if periode > 0 else 0.0,
+            'est_latency': latensi,
+            'alasan': alasan
+        }
+
+        if berubah:
+            print(f"[Governor] decode tiap {nd} frame, overlay tiap {no} frame "
+                  f"(est {self.keputusan['est_fps']:.1f} FPS, latensi {latensi*1000:.0f} ms, {alasan})")
+
+class IdleGovernor:
+    def __init__(self, cap, idle_after=120.0, idle_fps=3, idle_resolution=(640, 360),
+                 full_resolution=(1280, 720), full_fps=30, motion_threshold=0.01):
+        """
+        Governor hemat daya untuk stasiun yang tidak dijaga
+
+        Args:
+            cap: Objek cv2.VideoCapture yang diatur resolusi dan FPS-nya
+            idle_after: Lama (detik) tanpa deteksi dan tanpa gerakan sebelum masuk idle
+            idle_fps: Kecepatan capture dan proses saat idle
+            idle_resolution: Resolusi capture saat idle (width, height)
+            full_resolution: Resolusi capture normal (width, height)
+            full_fps: FPS capture normal
+            motion_threshold: Fraksi piksel berubah yang dianggap gerakan
+        """
+        self.cap = cap
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.idle_resolution = idle_resolution
+        self.full_resolution = full_resolution
+        self.full_fps = full_fps
+        self.motion_threshold = motion_threshold
+
+        # Ukuran frame kecil untuk deteksi gerakan (murah dihitung tiap frame)
+        self.motion_size = (160, 90)
+        self.prev_small = None
+
+        self.idle = False
+        self.baru_bangun = False
+        self.last_activity = time.time()
+        self.t_frame_mulai = time.perf_counter()
+
+    def deteksi_gerakan(self, frame):
+        """Deteksi gerakan dengan frame differencing pada gambar grayscale kecil"""
+        small = cv2.resize(frame, self.motion_size, interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        prev = self.prev_small
+        self.prev_small = small
+        if prev is None:
+            return False
+
+        diff = cv2.absdiff(small, prev)
+        _, mask = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(mask) > self.motion_threshold * mask.size
+
+    def update(self, frame, timestamp):
+        """Cek gerakan dan atur status idle, dipanggil sekali per frame"""
+        self.t_frame_mulai = time.perf_counter()
+        self.baru_bangun = False
+
+        if self.deteksi_gerakan(frame):
+            self.last_activity = timestamp
+            if self.idle:
+                self.bangun()
+        elif not self.idle and timestamp - self.last_activity > self.idle_after:
+            self.tidur()
+
+    def catat_aktivitas(self, timestamp):
+        """Deteksi QR atau input keyboard dianggap aktivitas"""
+        self.last_activity = timestamp
+        if self.idle:
+            self.bangun()
+
+    def tidur(self):
+        """Masuk mode idle: resolusi dan FPS capture diturunkan"""
+        self.idle = True
+        self.prev_small = None
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.idle_resolution[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.idle_resolution[1])
+        self.cap.set(cv2.CAP_PROP_FPS, self.idle_fps)
+        print(f"[{time.strftime('%H:%M:%S')}] Mode idle: capture {self.idle_resolution[0]}x"
+              f"{self.idle_resolution[1]} @ {self.idle_fps} FPS")
+
+    def bangun(self):
+        """Kembali ke kecepatan penuh karena ada gerakan"""
+        self.idle = False
+        self.baru_bangun = True
+        self.prev_small = None
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.full_resolution[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.full_resolution[1])
+        self.cap.set(cv2.CAP_PROP_FPS, self.full_fps)
+        print(f"[{time.strftime('%H:%M:%S')}] Gerakan terdeteksi, kembali ke mode penuh")
+
+    def sesuaikan_frame(self, frame):
+        """Samakan ukuran frame dengan resolusi penuh agar layout dan koordinat tetap"""
+        width, height = self.full_resolution
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_NEAREST)
+        return frame
+
+    def jeda_ms(self):
+        """Lama tunggu waitKey: saat idle, sisa waktu frame dipakai untuk tidur"""
+        if not self.idle:
+            return 1
+        elapsed_ms = (time.perf_counter() - self.t_frame_mulai) * 1000
+        return max(1, int(1000 / self.idle_fps - elapsed_ms))
+
+class FrameRingBuffer:
+    def __init__(self, slots=8, shape=(720, 1280, 3), name=None):
+        """
+        Ring buffer frame di shared memory, dibaca proses lain tanpa copy
+
+        Args:
+            slots: Jumlah slot frame
+            shape: Ukuran setiap frame (height, width, channel)
+            name: Nama shared memory yang sudah ada; None untuk membuat baru
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = name is None
+
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = slots * 16
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=header_bytes + slots * frame_bytes)
+        self.name = self.shm.name
+
+        # Header per slot: nomor urut frame (-1 saat sedang ditulis) dan timestamp capture
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.stamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=slots * 8)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=header_bytes)
+
+        if self.owner:
+            self.seqs[:] = -1
+
+    def tulis(self, frame, seq, timestamp):
+        """Tulis frame ke slot berikutnya, return nomor slot"""
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        self.frames[slot] = frame
+        self.stamps[slot] = timestamp
+        self.seqs[slot] = seq
+        return slot
+
+    def baca(self, slot):
+        """View frame di slot (zero-copy); cek valid() setelah selesai dipakai"""
+        return self.frames[slot]
+
+    def valid(self, slot, seq):
+        """Cek apakah slot masih berisi frame dengan nomor urut seq"""
+        return self.seqs[slot] == seq
+
+    def tutup(self):
+        """Lepas shared memory; pembuatnya sekaligus menghapus"""
+        # View numpy harus dilepas sebelum shared memory bisa ditutup
+        self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def proses_capture(shm_name, slots, shape, work_queue, control_queue, latest_seq, stop_event,
+                   camera_index=0):
+    """Proses capture: baca kamera dan tulis frame ke ring buffer"""
+    ring = FrameRingBuffer(slots, shape, name=shm_name)
+    cap = cv2.VideoCapture(camera_index)
+    height, width = shape[:2]
+    seq = 0
+
+    try:
+        while not stop_event.is_set():
+            # Perintah cap.set dari proses utama (misal dari governor idle)
+            while True:
+                try:
+                    prop, value = control_queue.get_nowait()
+                except queue.Empty:
+                    break
+                cap.set(prop, value)
+
+            ret, frame = cap.read()
+            if not ret:
+                print("Gagal membaca frame dari kamera")
+                break
+            timestamp = time.time()
+
+            frame = cv2.flip(frame, 1)
+            if frame.shape[0] != height or frame.shape[1] != width:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_NEAREST)
+
+            seq += 1
+            slot = ring.tulis(frame, seq, timestamp)
+            latest_seq.value = seq
+
+            # Jika semua decoder sibuk, frame ini hanya ditampilkan tanpa didecode
+            try:
+                work_queue.put_nowait((slot, seq, timestamp))
+            except queue.Full:
+                pass
+    finally:
+        cap.release()
+        stop_event.set()
+        ring.tutup()
+
+def proses_decoder(shm_name, slots, shape, work_queue, result_queue, stop_event):
+    """Proses decoder: decode frame dari ring buffer, kirim balik hasil kecil saja"""
+    ring = FrameRingBuffer(slots, shape, name=shm_name)
+    qr_detector = cv2.QRCodeDetector()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                slot, seq, timestamp = work_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            if not ring.valid(slot, seq):
+                continue
+
+            t_decode_mulai = time.time()
+            try:
+                found, datas, points, _ = qr_detector.detectAndDecodeMulti(ring.baca(slot))
+            except Exception as e:
+                continue
+            t_decode_selesai = time.time()
+
+            # Slot sudah ditimpa capture selama decode: hasilnya tidak bisa dipercaya
+            if not ring.valid(slot, seq):
+                continue
+
+            # Decode kosong juga dilaporkan: tracker menghitung miss dari frame yang di-decode
+            detections = []
+            if found:
+                detections = [(data.strip(), quad.astype(int).tolist())
+                              for data, quad in zip(datas, points) if data and data.strip()]
+            result_queue.put((seq, timestamp, t_decode_mulai, t_decode_selesai, detections))
+    finally:
+        ring.tutup()
+
+class PipelineMultiproses:
+    def __init__(self, camera_index=0, decoder_count=None, slots=8, shape=(720, 1280, 3)):
+        """
+        Pengganti cv2.VideoCapture: capture dan decode berjalan di proses terpisah
+
+        Args:
+            camera_index: Index kamera
+            decoder_count: Jumlah proses decoder (default: jumlah core - 1)
+            slots: Jumlah slot ring buffer
+            shape: Ukuran frame di ring buffer (height, width, channel)
+        """
+        self.camera_index = camera_index
+        self.decoder_count = decoder_count or max(1, (os.cpu_count() or 2) - 1)
+        self.ring = FrameRingBuffer(slots, shape)
+
+        self.work_queue = mp.Queue(maxsize=self.decoder_count)
+        self.result_queue = mp.Queue()
+        self.control_queue = mp.Queue()
+        self.latest_seq = mp.Value('q', 0, lock=False)
+        self.stop_event = mp.Event()
+
+        self.last_seq = 0
+        self.last_result_seq = 0
+        self.processes = []
+
+        # Salinan frame milik proses utama: main tidak pernah memegang view ke shared memory,
+        # jadi slot yang ditimpa capture atau release() tidak bisa merusak frame yang sedang dipakai
+        self.frame = np.empty(self.ring.shape, dtype=np.uint8)
+
+    def mulai(self):
+        """Jalankan proses capture dan decoder"""
+        args = (self.ring.name, self.ring.slots, self.ring.shape)
+        self.processes.append(mp.Process(
+            target=proses_capture,
+            args=args + (self.work_queue, self.control_queue, self.latest_seq, self.stop_event,
+                         self.camera_index),
+            daemon=True))
+        for _ in range(self.decoder_count):
+            self.processes.append(mp.Process(
+                target=proses_decoder,
+                args=args + (self.work_queue, self.result_queue, self.stop_event),
+                daemon=True))
+
+        for process in self.processes:
+            process.start()
+        print(f"✅ Pipeline multiproses: 1 capture + {self.decoder_count} decoder")
+
+    def set(self, prop, value):
+        """Teruskan pengaturan kamera ke proses capture"""
+        self.control_queue.put((prop, value))
+        return True
+
+    def read(self):
+        """
+        Tunggu frame baru lalu salin ke buffer milik proses utama (sudah di-mirror)
+
+        Buffer yang sama dipakai ulang setiap read(), seperti frame yang hanya berlaku sampai
+        read() berikutnya. Decoder tetap membaca ring buffer tanpa copy.
+        """
+        while self.latest_seq.value == self.last_seq:
+            if self.stop_event.is_set():
+                return False, None
+            time.sleep(0.001)
+
+        while True:
+            seq = self.latest_seq.value
+            slot = seq % self.ring.slots
+            np.copyto(self.frame, self.ring.baca(slot))
+            # Slot ditimpa capture selama disalin: ulangi dengan frame terbaru
+            if self.ring.valid(slot, seq):
+                break
+            if self.stop_event.is_set():
+                return False, None
+
+        self.last_seq = seq
+        return True, self.frame
+
+    def ambil_hasil(self):
+        """Ambil hasil decode yang sudah masuk, urut nomor frame: list (timestamp, waktu, detections)"""
+        results = []
+        while True:
+            try:
+                results.append(self.result_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        results.sort(key=lambda r: r[0])
+        hasil = []
+        for seq, timestamp, t_decode_mulai, t_decode_selesai, detections in results:
+            # Hasil frame yang lebih lama dari yang sudah diproses dibuang
+            if seq <= self.last_result_seq:
+                continue
+            self.last_result_seq = seq
+            waktu = {'capture': timestamp, 'decode_mulai': t_decode_mulai, 'decode_selesai': t_decode_selesai}
+            hasil.append((timestamp, waktu, [(data, np.array(quad).reshape(1, 4, 2))
+                                             for data, quad in detections]))
+        return hasil
+
+    def release(self):
+        """Hentikan semua proses dan hapus shared memory"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.ring.tutup()
+
 def main():
+    # Waktu mulai untuk mengukur time-to-first-frame
+    t_startup = time.perf_counter()
+    
+    # Log event JSONL (dirotasi per 10 MB) dan cetak konsol dari thread penulis
+    log = log_event.atur(path="log/event.jsonl", level='INFO', konsol=True)
+    
     # Konfigurasi Firebase - GANTI DENGAN KONFIGURASI ANDA
     FIREBASE_CREDENTIAL = "D:/Python Project/Randi UNP/SerialAccesKey.json"
     FIREBASE_DATABASE_URL = "https://python-data-b88bb-default-rtdb.firebaseio.com/"
     
-    # Inisialisasi detektor dengan Firebase
-    detector = QRCodeDetector(FIREBASE_CREDENTIAL, FIREBASE_DATABASE_URL)
+    # Target performa untuk governor load-shedding
+    TARGET_FPS = 25
+    MAX_SCAN_LATENCY = 0.3  # detik
+
+    # Masuk mode hemat daya setelah tidak ada deteksi dan gerakan selama ini
+    IDLE_SETELAH = 120.0  # detik
+
+    # Capture dan decode di proses terpisah (ring buffer shared memory)
+    MODE_MULTIPROSES = False
+
+    # Decode paralel per QR (detectMulti + warp + thread pool) untuk frame dengan banyak label;
+    # memakai lebih banyak CPU, jadi hanya diaktifkan di stasiun yang membutuhkan
+    DECODE_PARALEL = False
+
+    # Counter per stasiun (penghitung/<stasiun>) untuk banyak dok sekaligus;
+    # total dan ringkasan diperbarui oleh agregasi berkala
+    COUNTER_SHARD = False
+    AGREGASI_INTERVAL = 5.0  # detik
+
+    # Salin history ke arsip_reset_<waktu>.jsonl sebelum dihapus saat tombol F
+    ARSIP_RESET = True
+
+    # Snapshot indeks stok per barang (delta di stok_snapshot.json.delta)
+    STOK_SNAPSHOT = "stok_snapshot.json"
+
+    # Katalog barang (CSV: qr,nama,kategori,bin; atau SQLite tabel barang); None jika tidak ada
+    KATALOG = "katalog_barang.csv"
+
+    # Snapshot counter untuk startup berikutnya (sebelum ringkasan Firebase terbaca)
+    COUNTER_SNAPSHOT = "counter_snapshot.json"
+
+    # Scan yang belum terkirim disimpan di sini sampai Firebase mengonfirmasi
+    JOURNAL_OUTBOX = "outbox_journal.jsonl"
+
+    # Batas waktu dari start program sampai frame kamera pertama tampil
+    TARGET_FRAME_PERTAMA = 1.5  # detik
+
+    # Inisialisasi detektor; koneksi Firebase dibuka di latar agar kamera langsung jalan
+    detector = QRCodeDetector(FIREBASE_CREDENTIAL, FIREBASE_DATABASE_URL,
+                              {'counter_shard': COUNTER_SHARD, 'koneksi_latar': True,
+                               'journal_path': JOURNAL_OUTBOX},
+                              stok_path=STOK_SNAPSHOT, katalog_path=KATALOG,
+                              counter_path=COUNTER_SNAPSHOT)
+    detector.parallel_decode = DECODE_PARALEL
+    if COUNTER_SHARD:
+        detector.firebase.mulai_agregasi(AGREGASI_INTERVAL)
+
+    # Governor untuk mengatur frekuensi decode dan render overlay
+    governor = FrameGovernor(target_fps=TARGET_FPS, max_scan_latency=MAX_SCAN_LATENCY)
     
-    # Buka webcam
-    cap = cv2.VideoCapture(0)
+    # Buka webcam (langsung, atau lewat proses capture terpisah)
+    if MODE_MULTIPROSES:
+        cap = PipelineMultiproses(camera_index=0)
+        cap.mulai()
+    else:
+        cap = cv2.VideoCapture(0)
     
     # Set resolusi kamera
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
@@ -706,13 +2680,16 @@ def main():
     # Coba tingkatkan FPS
     cap.set(cv2.CAP_PROP_FPS, 30)
     
+    # Governor hemat daya saat stasiun tidak dipakai
+    idle_governor = IdleGovernor(cap, idle_after=IDLE_SETELAH)
+    
     print("=" * 50)
     print("SISTEM TRACKING BARANG QR CODE DENGAN FIREBASE")
     print("=" * 50)
     print("\nPETUNJUK PENGGUNAAN:")
     print("M - Mode MASUK (hijau) - Scan barang masuk")
     print("K - Mode KELUAR (merah) - Scan barang keluar")
-    print("R - Reset semua counter")
+    print("R - Reset counter tampilan (total Firebase tetap)")
     print("C - Clear history deteksi")
     print("F - Reset database Firebase")
     print("Q - Keluar dari program")
@@ -721,6 +2698,8 @@ def main():
     print("Data otomatis dikirim ke Firebase saat QR terdeteksi")
     print("=" * 50)
     
+    session_start = time.time()
+    frame_pertama = None
     last_mode_change = time.time()
     last_detection_time = 0
     
@@ -731,13 +2710,24 @@ def main():
     
     while True:
         # Baca frame dari kamera
+        t_stage = time.perf_counter()
         ret, frame = cap.read()
         if not ret:
             print("Gagal membaca frame dari kamera")
             break
+        capture_time = time.time()
         
-        # Mirror frame untuk tampilan yang lebih natural
-        frame = cv2.flip(frame, 1)
+        # Mirror frame untuk tampilan yang lebih natural (multiproses: sudah di proses capture)
+        if not MODE_MULTIPROSES:
+            frame = cv2.flip(frame, 1)
+        t_frame_start = time.perf_counter()
+        
+        # Cek gerakan; saat idle frame kecil diperbesar ke resolusi penuh
+        idle_governor.update(frame, time.time())
+        frame = idle_governor.sesuaikan_frame(frame)
+        mode_idle = idle_governor.idle
+        if not mode_idle:
+            governor.catat('capture', t_frame_start - t_stage)
         
         # Salin frame untuk output
         output_frame = frame.copy()
@@ -752,34 +2742,72 @@ def main():
         # Dapatkan timestamp
         current_time = time.time()
         
-        # Deteksi QR code
-        qr_data, bbox = detector.decode_qr(frame)
-        
-        # Proses QR code jika terdeteksi
-        if qr_data and bbox is not None:
-            if current_time - last_detection_time > 0.1:
-                success = detector.process_qr(qr_data, bbox, current_time)
-                if success:
-                    last_detection_time = current_time
+        # Deteksi QR code (governor bisa melewati decode saat beban tinggi,
+        # saat idle decode hanya dijalankan di frame yang membangunkan sistem)
+        t_decode = 0.0
+        if MODE_MULTIPROSES:
+            # Decode berjalan di proses decoder, di sini hanya hasilnya yang diproses
+            for frame_time, waktu, detections in cap.ambil_hasil():
+                if detections:
+                    idle_governor.catat_aktivitas(current_time)
+                if detector.use_tracker:
+                    detector.process_detections(detections, frame_time, waktu=waktu)
+                else:
+                    for qr_data, bbox in detections:
+                        detector.process_qr(qr_data, bbox, frame_time, waktu=waktu)
+        elif idle_governor.baru_bangun or (not mode_idle and governor.harus_decode()):
+            t_stage = time.perf_counter()
+            waktu = {'capture': capture_time, 'decode_mulai': time.time()}
+            detections = detector.decode_frame(frame)
+            waktu['decode_selesai'] = time.time()
+            
+            # Proses QR code jika terdeteksi
+            if detections:
+                idle_governor.catat_aktivitas(current_time)
+            
+            if detector.use_tracker:
+                # Tracker juga perlu frame kosong untuk mengakhiri track yang hilang
+                detector.process_detections(detections, current_time, waktu=waktu)
+            elif detections and current_time - last_detection_time > 0.1:
+                for qr_data, bbox in detections:
+                    success = detector.process_qr(qr_data, bbox, current_time, waktu=waktu)
+                    if success:
+                        last_detection_time = current_time
+            t_decode = time.perf_counter() - t_stage
+            governor.catat('decode', t_decode)
         
         # Update status display
         detector.update_display_status(current_time)
         
         # Gambar bounding box untuk QR yang masih aktif
-        for qr_data, info in list(detector.object_status.items()):
-            if 'bbox' in info:
-                output_frame = detector.draw_detection(output_frame, qr_data, info['bbox'], info['mode'])
-        
-        # Gambar panel kontrol di kanan
-        output_frame = detector.draw_control_panel_right(output_frame)
+        output_frame = detector.draw_detections(output_frame)
+        
+        # Gambar panel kontrol di kanan (dipakai ulang dari cache jika tidak di-refresh)
+        t_overlay = 0.0
+        if mode_idle or governor.harus_render_overlay() or detector.firebase.reset_status['aktif']:
+            t_stage = time.perf_counter()
+            output_frame = detector.draw_control_panel_cached(output_frame, refresh=True)
+            t_overlay = time.perf_counter() - t_stage
+            governor.catat('overlay', t_overlay)
+        else:
+            output_frame = detector.draw_control_panel_cached(output_frame, refresh=False)
         
         # Tampilkan FPS di kiri bawah
         cv2.putText(output_frame, f"FPS: {fps}", (20, output_frame.shape[0] - 20), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, detector.COLORS['info'], 1)
         
+        # Tampilkan keputusan governor
+        governor_text = f"Decode 1/{governor.decode_interval}  Overlay 1/{governor.overlay_interval}"
+        cv2.putText(output_frame, governor_text, (20, output_frame.shape[0] - 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.45, detector.COLORS['info'], 1)
+        
         # Tampilkan status kamera di kiri bawah
-        cv2.putText(output_frame, "KAMERA AKTIF", (20, output_frame.shape[0] - 40), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        if mode_idle:
+            cv2.putText(output_frame, "KAMERA IDLE (HEMAT DAYA)", (20, output_frame.shape[0] - 40), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, detector.COLORS['warning'], 1)
+        else:
+            cv2.putText(output_frame, "KAMERA AKTIF", (20, output_frame.shape[0] - 40), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         
         # Tampilkan pesan mode change di tengah bawah
         if current_time - last_mode_change < 2.0:
@@ -817,8 +2845,25 @@ def main():
         # Tampilkan frame
         cv2.imshow('QR Tracking System - Kamera Live + Panel Kontrol + Firebase', output_frame)
         
+        if frame_pertama is None:
+            frame_pertama = time.perf_counter() - t_startup
+            status = "✅" if frame_pertama <= TARGET_FRAME_PERTAMA else "⚠ melebihi target"
+            print(f"{status} Frame pertama tampil setelah {frame_pertama:.2f} detik "
+                  f"(target {TARGET_FRAME_PERTAMA:.1f} detik, Firebase: {detector.firebase.status_koneksi})")
+        
         # Handle keyboard input
-        key = cv2.waitKey(1) & 0xFF
+        key = cv2.waitKey(idle_governor.jeda_ms()) & 0xFF
+        
+        # Sisa waktu frame di luar capture, decode, dan overlay
+        if not mode_idle:
+            t_frame = time.perf_counter() - t_frame_start
+            governor.catat('lainnya', max(0.0, t_frame - t_decode - t_overlay))
+            governor.akhir_frame()
+        
+        # Tombol apapun mengubah isi panel, jadi paksa render ulang
+        if key != 0xFF:
+            detector.panel_cache = None
+            idle_governor.catat_aktivitas(current_time)
         
         if key == ord('q') or key == ord('Q'):
             break
@@ -831,25 +2876,52 @@ def main():
             last_mode_change = current_time
             print(f"[{time.strftime('%H:%M:%S')}] Mode diubah: KELUAR")
         elif key == ord('r') or key == ord('R'):
-            detector.count_masuk = 0
-            detector.count_keluar = 0
-            print(f"[{time.strftime('%H:%M:%S')}] Semua counter direset")
+            # Hanya tampilan sesi ini; total di Firebase tetap (tombol F untuk reset database)
+            detector.nolkan_counter()
+            print(f"[{time.strftime('%H:%M:%S')}] Counter tampilan direset (total Firebase tetap)")
         elif key == ord('c') or key == ord('C'):
             detector.clear_detection_history()
             print(f"[{time.strftime('%H:%M:%S')}] History deteksi dibersihkan")
         elif key == ord('f') or key == ord('F'):
             if detector.firebase.db:
-                if detector.firebase.reset_database():
-                    detector.count_masuk = 0
-                    detector.count_keluar = 0
-                    print(f"[{time.strftime('%H:%M:%S')}] Database Firebase berhasil direset")
+                # Hapus bertahap di latar agar loop video tidak terblokir
+                arsip = f"arsip_reset_{time.strftime('%Y%m%d_%H%M%S')}.jsonl" if ARSIP_RESET else None
+                if detector.firebase.reset_database_bertahap(arsip_path=arsip):
+                    detector.counter_setelah_reset()
+                    detector.stok.reset()
+                    print(f"[{time.strftime('%H:%M:%S')}] Reset database Firebase dimulai")
                 else:
-                    print(f"[{time.strftime('%H:%M:%S')}] Gagal reset database Firebase")
+                    print(f"[{time.strftime('%H:%M:%S')}] Reset database Firebase masih berjalan")
+    
+    # Selesaikan event yang masih antre di sink (tanpa batas waktu, agar acknowledgment dan
+    # stok semua scan tercatat), lalu kirim sisa scan di outbox
+    detector.bus.tutup(timeout=None)
+    if detector.firebase.pending and not detector.firebase.flush():
+        print(f"⚠ {len(detector.firebase.pending)} scan belum terkirim ke Firebase")
+    detector.firebase.hentikan_agregasi()
+    if detector.firebase.reset_thread is not None and detector.firebase.reset_thread.is_alive():
+        print("⏳ Menunggu reset database selesai...")
+        detector.firebase.reset_thread.join()
     
     # Release resources
+    detector.tutup()
     cap.release()
     cv2.destroyAllWindows()
     
+    # Simpan laporan latensi sesi
+    session_name = datetime.fromtimestamp(session_start).strftime('%Y%m%d_%H%M%S')
+    detector.latency.simpan_laporan(f"laporan_sesi_{session_name}.json", {
+        'mulai': datetime.fromtimestamp(session_start).isoformat(),
+        'selesai': datetime.now().isoformat(),
+        'frame_pertama_detik': frame_pertama
+    })
+    
+    # Tulis sisa log sebelum ringkasan akhir dicetak; produsen log di thread latar
+    # (agregasi, reset, listener) sudah dihentikan di atas, sisanya jatuh ke stderr
+    if log.dibuang:
+        print(f"⚠ {log.dibuang} event log dibuang karena antrean penuh")
+    log.tutup()
+    
     # Tampilkan ringkasan akhir
     print("\n" + "=" * 50)
     print("RINGKASAN AKHIR")
@@ -867,8 +2939,8 @@ def main():
         print(f"\n✓ STOK SEIMBANG: Masuk = Keluar")
     
     print("\n📤 Data telah dikirim ke Firebase:")
-    print("   - Barang Masuk: di path 'barang_masuk/history'")
-    print("   - Barang Keluar: di path 'barang_keluar/history'")
+    print("   - Barang Masuk: di path 'barang_masuk/history/<tanggal>'")
+    print("   - Barang Keluar: di path 'barang_keluar/history/<tanggal>'")
     print("   - Ringkasan: di path 'ringkasan'")
     print("=" * 50)
 
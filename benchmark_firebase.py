@@ -0,0 +1,101 @@
+import argparse
+import time
+
+import firebase_lokal
+import log_event
+from firebase import FirebaseRealtimeDB
+
+# Benchmark send_multiple_data: satu push per data (cara lama) dibanding multi-path update
+# per potongan (cara baru), terhadap database lokal dengan latensi per request yang bisa diatur.
+# Cara lama untuk jumlah besar diukur pada sampel lalu diekstrapolasi agar benchmark tetap singkat.
+
+def buat_data(jumlah):
+    """Data sensor tiruan"""
+    return [{'reading_id': i, 'temperature': 25.0 + (i % 50) * 0.1, 'humidity': 60 - (i % 20),
+             'status': 'normal'} for i in range(jumlah)]
+
+def cara_lama(firebase, path, data_list):
+    """Satu request push() per data, seperti implementasi sebelumnya"""
+    ref = firebase.db.child(path)
+    for data in data_list:
+        ref.push(data)
+
+def ukur(fungsi):
+    mulai = time.perf_counter()
+    fungsi()
+    return time.perf_counter() - mulai
+
+def jalankan(jumlah_list, latency, chunk, workers, sampel_lama):
+    """
+    Jalankan benchmark untuk setiap jumlah data
+
+    Args:
+        jumlah_list: Daftar jumlah data, misal [1000, 100000]
+        latency: Latensi per request database lokal (detik)
+        chunk: Data per request untuk cara baru
+        workers: Request paralel untuk cara baru
+        sampel_lama: Jumlah data maksimal yang benar-benar dikirim dengan cara lama
+    """
+    # Pesan per pengiriman tidak perlu tampil di konsol selama benchmark
+    log_event.atur(konsol=False)
+
+    hasil = []
+    for jumlah in jumlah_list:
+        nama = f"bench{jumlah}"
+        url = f"lokal://{nama}?latency={latency}"
+        firebase = FirebaseRealtimeDB(None, url)
+        database = firebase_lokal.database(url)
+
+        # Cara lama (sampel, lalu diekstrapolasi bila perlu)
+        n_lama = min(jumlah, sampel_lama)
+        t_lama = ukur(lambda: cara_lama(firebase, 'lama', buat_data(n_lama))) * jumlah / n_lama
+
+        # Cara baru, berurutan dan paralel
+        data = buat_data(jumlah)
+        sebelum = dict(database.statistik)
+        t_baru = ukur(lambda: firebase.send_multiple_data('baru', data, chunk_size=chunk))
+        request_baru = database.statistik.get('update', 0) - sebelum.get('update', 0)
+
+        data = buat_data(jumlah)
+        t_paralel = ukur(lambda: firebase.send_multiple_data('paralel', data, chunk_size=chunk,
+                                                              max_workers=workers))
+
+        tersimpan = len(firebase.db.child('baru').get(shallow=True) or {})
+        hasil.append({
+            'jumlah': jumlah,
+            'lama': t_lama,
+            'lama_ekstrapolasi': n_lama < jumlah,
+            'baru': t_baru,
+            'paralel': t_paralel,
+            'request_baru': request_baru,
+            'tersimpan': tersimpan
+        })
+        firebase_lokal.hapus_database(nama)
+
+    print("\n" + "=" * 72)
+    print(f"BENCHMARK send_multiple_data (latensi {latency * 1000:.1f} ms/request, "
+          f"chunk {chunk}, {workers} worker)")
+    print("=" * 72)
+    print(f"{'Data':>8}{'push per data':>18}{'multi-path':>14}{'paralel':>12}{'speedup':>10}{'request':>10}")
+    for h in hasil:
+        lama = f"{h['lama']:.2f} s" + ('*' if h['lama_ekstrapolasi'] else '')
+        print(f"{h['jumlah']:>8}{lama:>18}{h['baru']:>12.2f} s{h['paralel']:>10.2f} s"
+              f"{h['lama'] / max(h['paralel'], 1e-9):>9.0f}x{h['request_baru']:>10}")
+    if any(h['lama_ekstrapolasi'] for h in hasil):
+        print(f"* diekstrapolasi dari {sampel_lama} data")
+    print("=" * 72)
+    return hasil
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark send_multiple_data terhadap database lokal")
+    parser.add_argument('--jumlah', type=int, nargs='+', default=[1000, 100000], help="Jumlah data per skenario")
+    parser.add_argument('--latency', type=float, default=0.005, help="Latensi per request (detik)")
+    parser.add_argument('--chunk', type=int, default=500, help="Data per request multi-path update")
+    parser.add_argument('--workers', type=int, default=4, help="Request paralel")
+    parser.add_argument('--sampel-lama', type=int, default=2000,
+                        help="Maksimal data yang dikirim dengan cara lama (sisanya diekstrapolasi)")
+    args = parser.parse_args()
+    jalankan(args.jumlah, args.latency, args.chunk, args.workers, args.sampel_lama)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+
+from FinishMode import baca_record, buat_record, buat_session_id, kunci_scan
+from firebase_lokal import buat_push_id
+
+# Benchmark ukuran record history: format lama (v1, ISO string + field mode, key push ID)
+# dibanding format ringkas (v2, epoch ms + stasiun + nomor urut, mode dari path).
+# Key dan record v2 dibuat dengan helper yang sama seperti FirebaseManager.catat_scan.
+
+def record_v1(qr_data, waktu, mode):
+    """Record history seperti yang ditulis versi lama"""
+    return {
+        'qr_data': qr_data,
+        'waktu': waktu.isoformat(),
+        'mode': mode
+    }
+
+def ukuran_json(value):
+    """Ukuran JSON kompak dalam byte (seperti body request ke REST API)"""
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def jalankan(jumlah, station_id, payload_unik, seed=None):
+    """
+    Bandingkan ukuran kedua format untuk sejumlah scan
+
+    Args:
+        jumlah: Jumlah scan yang disimulasikan
+        station_id: ID stasiun pada record v2
+        payload_unik: Jumlah payload QR berbeda
+        seed: Seed random
+    """
+    rng = random.Random(seed)
+    t0 = time.time()
+    session_id = buat_session_id()
+    total = {'v1_body': 0, 'v2_body': 0, 'v1_simpan': 0, 'v2_simpan': 0}
+    waktu_baca = {'v1': 0.0, 'v2': 0.0}
+
+    for i in range(jumlah):
+        timestamp = t0 + i * 0.05
+        waktu = datetime.fromtimestamp(timestamp)
+        qr_data = f"BRG-{rng.randrange(payload_unik):06d}"
+        mode = 'masuk' if rng.random() < 0.6 else 'keluar'
+        key_v1 = buat_push_id(int(timestamp * 1000))
+        key_v2 = kunci_scan(session_id, i + 1)
+
+        v1 = record_v1(qr_data, waktu, mode)
+        v2 = buat_record(qr_data, int(timestamp * 1000), station_id, i + 1)
+
+        # Bandwidth: body yang dikirim per scan
+        body_v1 = ukuran_json(v1)
+        body_v2 = ukuran_json(v2)
+        total['v1_body'] += body_v1
+        total['v2_body'] += body_v2
+
+        # Penyimpanan: key + record (v1: push ID, v2: sesi + nomor urut)
+        total['v1_simpan'] += len(key_v1) + body_v1
+        total['v2_simpan'] += len(key_v2) + body_v2
+
+        # Biaya membaca kedua format dengan reader yang sama (sampel)
+        if i % 100 == 0:
+            mulai = time.perf_counter()
+            baca_record(v1, mode)
+            waktu_baca['v1'] += time.perf_counter() - mulai
+            mulai = time.perf_counter()
+            baca_record(v2, mode)
+            waktu_baca['v2'] += time.perf_counter() - mulai
+
+    skala = 1_000_000 / jumlah
+    sampel_baca = max(1, (jumlah + 99) // 100)
+
+    print("\n" + "=" * 56)
+    print(f"BENCHMARK FORMAT RECORD ({jumlah} scan, dinormalisasi ke 1 juta)")
+    print("=" * 56)
+    print(f"{'':24}{'v1 (lama)':>14}{'v2 (ringkas)':>16}")
+    for nama, key in (('Rata-rata body (byte)', 'body'), ('Rata-rata simpan (byte)', 'simpan')):
+        print(f"{nama:24}{total['v1_' + key] / jumlah:>14.1f}{total['v2_' + key] / jumlah:>16.1f}")
+    for nama, key in (('Bandwidth / 1 juta', 'body'), ('Penyimpanan / 1 juta', 'simpan')):
+        v1 = total['v1_' + key] * skala / 1e6
+        v2 = total['v2_' + key] * skala / 1e6
+        print(f"{nama:24}{v1:>11.1f} MB{v2:>13.1f} MB   hemat {v1 - v2:.1f} MB ({(1 - v2 / v1) * 100:.0f}%)")
+    print(f"{'Baca record (us)':24}{waktu_baca['v1'] / sampel_baca * 1e6:>14.2f}"
+          f"{waktu_baca['v2'] / sampel_baca * 1e6:>16.2f}")
+    print("=" * 56)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ukuran record history v1 vs v2")
+    parser.add_argument('--jumlah', type=int, default=1_000_000, help="Jumlah scan yang disimulasikan")
+    parser.add_argument('--stasiun', default='DOK-01', help="ID stasiun pada record v2")
+    parser.add_argument('--payload-unik', type=int, default=5000, help="Jumlah payload berbeda")
+    parser.add_argument('--seed', type=int, default=1, help="Seed random")
+    args = parser.parse_args()
+    jalankan(args.jumlah, args.stasiun, args.payload_unik, args.seed)
+
+if __name__ == "__main__":
+    main()
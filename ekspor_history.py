@@ -0,0 +1,327 @@
+import argparse
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+
+from FinishMode import FirebaseManager, baca_record, daftar_bucket
+
+# Ekspor history scan ke CSV atau Parquet untuk rekonsiliasi dengan ERP.
+# History dibaca per halaman (order_by_key + limit_to_first) bucket demi bucket,
+# jadi memori tetap kecil berapa pun besarnya history. Posisi terakhir disimpan di
+# file state pada setiap checkpoint, yaitu setelah baris benar-benar aman di disk,
+# sehingga ekspor yang terputus bisa dilanjutkan tanpa baris ganda atau hilang.
+# Key tidak urut waktu dan outbox stasiun bisa mengirim scan lama belakangan, jadi posisi
+# key hanya dicatat untuk bucket yang sudah tertutup (berakhir lebih dari masa tenggang
+# yang lalu). Bucket yang masih terbuka selalu diekspor ulang dari awal saat dilanjutkan.
+
+KOLOM = ['mode', 'key', 'bucket', 'timestamp_ms', 'waktu', 'qr_data', 'stasiun', 'urutan', 'versi']
+
+def baca_state(path):
+    """State ekspor terakhir: {mode: {'bucket': ..., 'key': ...} atau {'selesai': True}}"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def simpan_state(path, state):
+    """Tulis state secara atomik (file sementara lalu rename)"""
+    if not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+class PenulisCSV:
+    # Checkpoint setiap halaman (fsync cukup murah untuk satu halaman baris)
+    baris_per_checkpoint = 0
+
+    def __init__(self, path, lanjut, posisi=None):
+        """
+        Penulis baris CSV
+
+        Args:
+            path: File output
+            lanjut: Tambahkan ke file yang sudah ada (tanpa header ulang)
+            posisi: Ukuran file pada checkpoint terakhir; baris setelahnya (ditulis sebelum
+                ekspor terputus, tetapi belum tercatat di state) dibuang
+        """
+        baru = not (lanjut and os.path.exists(path))
+        self.file = open(path, 'w' if baru else 'r+', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=KOLOM)
+        if baru:
+            self.writer.writeheader()
+        else:
+            self.file.seek(0, os.SEEK_END)
+            if posisi is not None and posisi < self.file.tell():
+                self.file.truncate(posisi)
+                self.file.seek(posisi)
+
+    def tulis(self, rows):
+        self.writer.writerows(rows)
+
+    def checkpoint(self):
+        """Pastikan semua baris sudah di disk; return posisi file untuk state"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def tutup(self):
+        self.file.close()
+
+class PenulisParquet:
+    # File Parquet baru bisa dibaca setelah footer ditulis saat ditutup, jadi checkpoint
+    # menutup file bagian; checkpoint per halaman akan membuat terlalu banyak file kecil
+    baris_per_checkpoint = 100000
+
+    def __init__(self, path, lanjut, posisi=None):
+        """
+        Penulis Parquet (butuh pyarrow), satu row group per halaman
+
+        File Parquet tidak bisa ditambah, jadi setiap checkpoint menutup file saat ini dan
+        baris berikutnya ditulis ke file bagian baru (nama.part1.parquet, nama.part2.parquet, ...).
+        File ditulis sebagai .tmp dan baru diganti nama setelah ditutup, sehingga file bagian
+        yang tidak lengkap dari ekspor yang terputus tidak pernah terlihat sebagai hasil.
+
+        Args:
+            path: File output (bagian pertama)
+            lanjut: Lanjutkan ekspor sebelumnya mulai dari nomor bagian berikutnya
+            posisi: Tidak dipakai (hanya untuk CSV)
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Ekspor Parquet membutuhkan pyarrow (pip install pyarrow)")
+
+        self.pq = pq
+        self.path_utama = path
+        self.bagian = 0
+        if lanjut:
+            while os.path.exists(self.nama_bagian(self.bagian)):
+                self.bagian += 1
+        self.writer = None
+        self.path_tmp = None
+        self.path = None
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('mode', pa.string()),
+            ('key', pa.string()),
+            ('bucket', pa.string()),
+            ('timestamp_ms', pa.int64()),
+            ('waktu', pa.string()),
+            ('qr_data', pa.string()),
+            ('stasiun', pa.string()),
+            ('urutan', pa.int64()),
+            ('versi', pa.int8())
+        ])
+
+    def nama_bagian(self, bagian):
+        """nama.parquet untuk bagian 0, nama.partN.parquet untuk bagian berikutnya"""
+        if bagian == 0:
+            return self.path_utama
+        stem, ext = os.path.splitext(self.path_utama)
+        return f"{stem}.part{bagian}{ext}"
+
+    def tulis(self, rows):
+        if not rows:
+            return
+        if self.writer is None:
+            self.path_tmp = self.nama_bagian(self.bagian) + '.tmp'
+            self.writer = self.pq.ParquetWriter(self.path_tmp, self.schema)
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def checkpoint(self):
+        """Tutup file bagian saat ini (footer ditulis) lalu beri nama akhirnya"""
+        if self.writer is None:
+            return None
+        self.writer.close()
+        self.writer = None
+        with open(self.path_tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        path = self.nama_bagian(self.bagian)
+        os.replace(self.path_tmp, path)
+        self.path = self.path or path
+        self.bagian += 1
+        # Posisi tidak diperlukan: resume selalu mulai di file bagian baru
+        return None
+
+    def tutup(self):
+        # Baris setelah checkpoint terakhir belum tercatat di state: file .tmp dibuang,
+        # ekspor berikutnya membaca ulang halaman tersebut
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.remove(self.path_tmp)
+
+def akhir_bucket(bucket, shard):
+    """Waktu berakhirnya bucket; None untuk history datar (tidak pernah tertutup)"""
+    if not shard:
+        return None
+    if shard == 'jam':
+        return datetime.strptime(bucket, '%Y-%m-%d/%H') + timedelta(hours=1)
+    return datetime.strptime(bucket, '%Y-%m-%d') + timedelta(days=1)
+
+def daftar_path(mode, mulai, selesai, shard):
+    """Path bucket history untuk rentang waktu, urut waktu"""
+    if not shard:
+        return [(f"barang_{mode}/history", '')]
+    return [(f"barang_{mode}/history/{bucket}", bucket) for bucket in daftar_bucket(mulai, selesai, shard)]
+
+def ekspor_mode(firebase, mode, penulis, mulai, selesai, chunk, state, state_path,
+                tenggang=timedelta(hours=24)):
+    """
+    Ekspor history satu mode, halaman demi halaman
+
+    Args:
+        firebase: FirebaseManager yang sudah terhubung
+        mode: 'masuk' atau 'keluar'
+        penulis: PenulisCSV atau PenulisParquet
+        mulai, selesai: Rentang waktu (datetime)
+        chunk: Jumlah record per halaman
+        state: Dict state ekspor (diperbarui pada setiap checkpoint)
+        state_path: File state, None untuk tanpa resume
+        tenggang: Bucket yang berakhir lebih dari tenggang yang lalu dianggap tertutup
+            (tidak ada lagi kiriman outbox yang terlambat)
+
+    Returns:
+        Jumlah baris yang diekspor
+    """
+    mulai_ms = int(mulai.timestamp() * 1000)
+    selesai_ms = int(selesai.timestamp() * 1000)
+    batas_tutup = datetime.now() - tenggang
+    posisi = state.get(mode, {})
+    jumlah = 0
+    belum_checkpoint = 0
+
+    if posisi.get('selesai'):
+        print(f"   barang_{mode}: sudah selesai pada ekspor sebelumnya")
+        return 0
+
+    def checkpoint(posisi_baru):
+        # State hanya ditulis setelah penulis memastikan baris aman di disk, jadi resume
+        # tidak menggandakan atau melewatkan baris
+        posisi_file = penulis.checkpoint()
+        state[mode] = posisi_baru
+        if posisi_file is not None:
+            state['posisi_file'] = posisi_file
+        simpan_state(state_path, state)
+
+    for path, bucket in daftar_path(mode, mulai, selesai, firebase.history_shard):
+        # Posisi di state selalu milik bucket tertutup, jadi bucket sebelumnya sudah lengkap
+        if posisi and bucket < posisi.get('bucket', ''):
+            continue
+        start_key = posisi.get('key') if posisi.get('bucket') == bucket else None
+
+        # Bucket terbuka masih bisa menerima key di posisi mana pun; tanpa checkpoint, baris
+        # yang sudah ditulis dipotong saat resume dan bucket diekspor ulang dari awal.
+        # Bucket urut waktu, jadi setelah bucket terbuka pertama tidak ada checkpoint lagi
+        # sampai seluruh mode selesai.
+        akhir = akhir_bucket(bucket, firebase.history_shard)
+        tertutup = akhir is not None and akhir <= batas_tutup
+
+        ref = firebase.db.child(path)
+        jumlah_bucket = 0
+        while True:
+            query = ref.order_by_key()
+            if start_key is not None:
+                query = query.start_at(start_key)
+            page = query.limit_to_first(chunk + (1 if start_key else 0)).get() or {}
+
+            items = [(key, record) for key, record in page.items() if key != start_key]
+            if not items:
+                break
+            start_key = items[-1][0]
+
+            rows = []
+            for key, record in items:
+                hasil = baca_record(record, mode)
+                if not hasil or hasil['timestamp_ms'] is None:
+                    continue
+                if not mulai_ms <= hasil['timestamp_ms'] <= selesai_ms:
+                    continue
+                rows.append({
+                    'mode': mode,
+                    'key': key,
+                    'bucket': bucket,
+                    'timestamp_ms': hasil['timestamp_ms'],
+                    'waktu': hasil['waktu'].isoformat(),
+                    'qr_data': hasil['qr_data'],
+                    'stasiun': hasil['stasiun'],
+                    'urutan': hasil['urutan'],
+                    'versi': hasil['versi']
+                })
+
+            penulis.tulis(rows)
+            jumlah_bucket += len(rows)
+            belum_checkpoint += len(rows)
+
+            if tertutup and belum_checkpoint >= penulis.baris_per_checkpoint:
+                checkpoint({'bucket': bucket, 'key': start_key})
+                belum_checkpoint = 0
+
+        if tertutup and (belum_checkpoint or start_key is not None):
+            checkpoint({'bucket': bucket, 'key': start_key})
+            belum_checkpoint = 0
+
+        if jumlah_bucket:
+            jumlah += jumlah_bucket
+            print(f"   barang_{mode}: {jumlah} baris (sampai {bucket or 'history'})")
+
+    # Termasuk baris bucket terbuka; scan yang masuk ke bucket itu setelah ini tidak ikut
+    checkpoint({'selesai': True})
+    return jumlah
+
+def parse_waktu(teks):
+    """Tanggal/waktu ISO dari argumen CLI"""
+    return datetime.fromisoformat(teks) if teks else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor history scan ke CSV atau Parquet")
+    parser.add_argument('--url', required=True, help="URL database (Firebase atau lokal://)")
+    parser.add_argument('--credential', default=None, help="Path service account")
+    parser.add_argument('--output', required=True, help="File output (.csv atau .parquet)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help="Format output (default: dari ekstensi file)")
+    parser.add_argument('--mode', choices=['masuk', 'keluar', 'semua'], default='semua')
+    parser.add_argument('--mulai', default=None, help="Waktu awal ISO, misal 2024-05-01 (default: 24 jam terakhir)")
+    parser.add_argument('--selesai', default=None, help="Waktu akhir ISO (default: sekarang)")
+    parser.add_argument('--shard', choices=['hari', 'jam', 'datar'], default='hari',
+                        help="Layout history di database")
+    parser.add_argument('--chunk', type=int, default=1000, help="Record per halaman")
+    parser.add_argument('--state', default=None, help="File state untuk melanjutkan ekspor yang terputus")
+    parser.add_argument('--tenggang', type=float, default=24.0,
+                        help="Jam setelah bucket berakhir sampai bucket dianggap tertutup")
+    args = parser.parse_args()
+
+    selesai = parse_waktu(args.selesai) or datetime.now()
+    mulai = parse_waktu(args.mulai) or selesai - timedelta(days=1)
+    fmt = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+
+    firebase = FirebaseManager(args.credential, args.url,
+                               history_shard=None if args.shard == 'datar' else args.shard)
+    if not firebase.db:
+        print("❌ Database tidak tersedia")
+        return
+
+    state = baca_state(args.state)
+    lanjut = bool(state)
+    kelas = PenulisParquet if fmt == 'parquet' else PenulisCSV
+    penulis = kelas(args.output, lanjut, state.get('posisi_file'))
+
+    modes = ['masuk', 'keluar'] if args.mode == 'semua' else [args.mode]
+    total = 0
+    try:
+        for mode in modes:
+            print(f"\n📤 Ekspor barang_{mode}: {mulai.isoformat()} s/d {selesai.isoformat()}")
+            total += ekspor_mode(firebase, mode, penulis, mulai, selesai, args.chunk, state, args.state,
+                                 timedelta(hours=args.tenggang))
+    finally:
+        penulis.tutup()
+
+    print(f"\n✅ Selesai: {total} baris diekspor ke {getattr(penulis, 'path', None) or args.output}")
+
+if __name__ == "__main__":
+    main()
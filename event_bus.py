@@ -0,0 +1,122 @@
+import threading
+from collections import deque
+
+import log_event
+
+# Event bus di dalam proses: detektor hanya mem-publish event scan, sedangkan setiap
+# sink (Firebase, indeks stok, notifikasi eksternal, ...) memprosesnya di thread sendiri.
+# publish() tidak pernah menunggu sink; antrean yang penuh ditangani sesuai kebijakan
+# masing-masing sink.
+
+# Kebijakan saat antrean sink penuh
+KEBIJAKAN = ('buang_lama', 'buang_baru', 'tanpa_batas')
+
+class Sink:
+    def __init__(self, nama, handler, kapasitas=1000, kebijakan='buang_lama'):
+        """
+        Satu pelanggan event dengan antrean dan thread pekerja sendiri
+
+        Args:
+            nama: Nama sink (untuk statistik dan log)
+            handler: Fungsi yang dipanggil dengan satu event
+            kapasitas: Panjang antrean maksimal (diabaikan untuk 'tanpa_batas')
+            kebijakan: 'buang_lama' (event tertua dibuang), 'buang_baru' (event baru ditolak),
+                atau 'tanpa_batas' (tidak pernah membuang, untuk sink yang tidak boleh kehilangan data)
+        """
+        if kebijakan not in KEBIJAKAN:
+            raise ValueError(f"Kebijakan tidak dikenal: {kebijakan!r}")
+
+        self.nama = nama
+        self.handler = handler
+        self.kapasitas = kapasitas
+        self.kebijakan = kebijakan
+        self.antrean = deque()
+        self.cond = threading.Condition()
+        self.berhenti = False
+        self.statistik = {'diterima': 0, 'diproses': 0, 'dibuang': 0, 'error': 0}
+        self.log = log_event.default()
+
+        self.thread = threading.Thread(target=self.pekerja, name=f"sink-{nama}", daemon=True)
+        self.thread.start()
+
+    def kirim(self, event):
+        """Masukkan event ke antrean tanpa menunggu"""
+        with self.cond:
+            self.statistik['diterima'] += 1
+            if self.kebijakan != 'tanpa_batas' and len(self.antrean) >= self.kapasitas:
+                self.statistik['dibuang'] += 1
+                if self.kebijakan == 'buang_baru':
+                    return False
+                self.antrean.popleft()
+            self.antrean.append(event)
+            self.cond.notify()
+            return True
+
+    def pekerja(self):
+        while True:
+            with self.cond:
+                while not self.antrean and not self.berhenti:
+                    self.cond.wait()
+                if not self.antrean:
+                    return
+                event = self.antrean.popleft()
+
+            try:
+                self.handler(event)
+                self.statistik['diproses'] += 1
+            except Exception as e:
+                self.statistik['error'] += 1
+                self.log.error('sink_error', f"❌ Error sink {self.nama}: {e}", sink=self.nama, error=str(e))
+
+    def tutup(self, timeout=5.0):
+        """Proses sisa antrean lalu hentikan pekerja"""
+        with self.cond:
+            self.berhenti = True
+            self.cond.notify()
+        self.thread.join(timeout=timeout)
+        return not self.thread.is_alive()
+
+class EventBus:
+    def __init__(self):
+        """Event bus publish/subscribe per topik"""
+        self.sinks = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, topik, nama, handler, kapasitas=1000, kebijakan='buang_lama'):
+        """
+        Daftarkan sink untuk sebuah topik (lihat Sink untuk arti parameter)
+
+        Returns:
+            Objek Sink (untuk statistik)
+        """
+        sink = Sink(nama, handler, kapasitas, kebijakan)
+        with self.lock:
+            self.sinks.setdefault(topik, []).append(sink)
+        return sink
+
+    def publish(self, topik, event):
+        """Kirim event ke semua sink topik; tidak pernah menunggu sink"""
+        for sink in self.sinks.get(topik, ()):
+            sink.kirim(event)
+
+    def statistik(self):
+        """Statistik per sink: diterima, diproses, dibuang, error, antre"""
+        hasil = {}
+        for sinks in self.sinks.values():
+            for sink in sinks:
+                hasil[sink.nama] = dict(sink.statistik, antre=len(sink.antrean))
+        return hasil
+
+    def tutup(self, timeout=5.0):
+        """
+        Kosongkan semua antrean sink lalu hentikan pekerjanya
+
+        Args:
+            timeout: Batas waktu per sink (detik); None untuk menunggu sampai antrean habis
+        """
+        with self.lock:
+            sinks = [sink for daftar in self.sinks.values() for sink in daftar]
+            self.sinks = {}
+        for sink in sinks:
+            if not sink.tutup(timeout):
+                print(f"⚠ Sink {sink.nama} belum selesai ({len(sink.antrean)} event tersisa)")
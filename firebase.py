@@ -1,8 +1,12 @@
 import firebase_admin
 from firebase_admin import credentials, db
-import json
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import firebase_lokal
+import log_event
 
 # Konfigurasi Firebase
 class FirebaseRealtimeDB:
@@ -12,9 +16,19 @@ class FirebaseRealtimeDB:
         
         Args:
             credential_path: Path ke file service account key (JSON)
-            database_url: URL database Firebase
+            database_url: URL database Firebase, atau lokal://nama?opsi untuk
+                database lokal (lihat firebase_lokal.py)
         """
+        # Log event per pengiriman (antrean, tanpa I/O di thread pemanggil)
+        self.log = log_event.default()
+        
         try:
+            # Database lokal untuk pengujian dan benchmark, tanpa credential
+            if firebase_lokal.adalah_url_lokal(database_url):
+                self.db = firebase_lokal.reference(database_url)
+                print(f"✅ Database lokal digunakan: {database_url}")
+                return
+            
             # Inisialisasi Firebase hanya sekali
             if not firebase_admin._apps:
                 # Load credential dari file
@@ -50,13 +64,34 @@ class FirebaseRealtimeDB:
             # Atau gunakan set() untuk menimpa data:
             # ref.set(data)
             
-            print(f"✅ Data berhasil dikirim ke path: {path}")
-            print(f"📊 Data: {json.dumps(data, indent=2)}")
+            # Data diserialisasi oleh thread log, bukan di sini
+            self.log.info('kirim', f"✅ Data berhasil dikirim ke path: {path}", path=path, data=dict(data))
             return True
             
         except Exception as e:
-            print(f"❌ Error mengirim data: {e}")
+            self.log.error('kirim_gagal', f"❌ Error mengirim data: {e}", path=path, error=str(e))
+            return False
+    
+    def atur_koneksi(self, ukuran_pool):
+        """
+        Perbesar pool koneksi keep-alive untuk penulis paralel
+        
+        firebase_admin sudah memakai satu requests.Session per app, tetapi pool bawaannya
+        hanya 10 koneksi; worker di atas itu akan membuka dan membuang koneksi baru.
+        
+        Returns:
+            True jika pool diubah; False untuk database lokal atau SDK tanpa session
+        """
+        client = getattr(self.db, '_client', None)
+        session = getattr(client, 'session', None)
+        if session is None:
             return False
+        
+        from requests.adapters import HTTPAdapter
+        lama = session.get_adapter('https://')
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=ukuran_pool,
+                                               max_retries=lama.max_retries))
+        return True
     
     def send_sensor_data(self, sensor_type, value, unit="", location=""):
         """
@@ -79,28 +114,399 @@ class FirebaseRealtimeDB:
         path = f"sensors/{sensor_type}"
         return self.send_data(path, data)
     
-    def send_multiple_data(self, path, data_list):
+    def send_multiple_data(self, path, data_list, chunk_size=500, max_workers=1, percobaan=3):
         """
         Mengirim beberapa data sekaligus
         
+        Key push dibuat secara lokal (format sama dengan push ID Firebase), lalu seluruh list
+        dikirim per potongan lewat multi-path update: satu request per chunk_size data, bukan
+        satu request per data. Karena key sudah tetap, potongan yang gagal aman dikirim ulang.
+        
         Args:
             path: Path di database
             data_list: List berisi dictionary data
+            chunk_size: Jumlah data per request update
+            max_workers: Jumlah request paralel untuk list yang sangat besar (1 = berurutan)
+            percobaan: Jumlah percobaan per potongan sebelum dianggap gagal
         """
         try:
             ref = self.db.child(path)
-            for data in data_list:
-                if 'timestamp' not in data:
-                    data['timestamp'] = datetime.now().isoformat()
-                ref.push(data)
             
-            print(f"✅ {len(data_list)} data berhasil dikirim ke path: {path}")
+            potongan = []
+            for start in range(0, len(data_list), chunk_size):
+                update = {}
+                for data in data_list[start:start + chunk_size]:
+                    if 'timestamp' not in data:
+                        data['timestamp'] = datetime.now().isoformat()
+                    update[firebase_lokal.buat_push_id()] = data
+                potongan.append(update)
+            
+            def kirim(update):
+                for ke in range(percobaan):
+                    try:
+                        ref.update(update)
+                        return True
+                    except Exception:
+                        if ke == percobaan - 1:
+                            raise
+                        time.sleep(0.1 * (ke + 1))
+            
+            if max_workers > 1 and len(potongan) > 1:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(potongan))) as pool:
+                    list(pool.map(kirim, potongan))
+            else:
+                for update in potongan:
+                    kirim(update)
+            
+            self.log.info('kirim_banyak', f"✅ {len(data_list)} data berhasil dikirim ke path: {path}",
+                          path=path, jumlah=len(data_list), request=len(potongan))
             return True
             
         except Exception as e:
-            print(f"❌ Error mengirim multiple data: {e}")
+            self.log.error('kirim_gagal', f"❌ Error mengirim multiple data: {e}", path=path, error=str(e))
             return False
 
+class PenulisParalel:
+    def __init__(self, firebase, max_workers=8, max_antre=10000, percobaan=3):
+        """
+        Kirim data secara konkuren lewat pool worker, dengan koneksi yang dipakai ulang
+        
+        Setiap penulisan mengembalikan Future: pemanggil bisa langsung lanjut (fire and forget)
+        atau menunggu hasilnya. Penulisan yang gagal dicoba ulang; key push dibuat lokal
+        sehingga percobaan ulang tidak membuat data ganda.
+        
+        Args:
+            firebase: FirebaseRealtimeDB yang sudah terhubung
+            max_workers: Jumlah request paralel
+            max_antre: Jumlah penulisan yang belum selesai; jika penuh, kirim() menunggu
+            percobaan: Jumlah percobaan per penulisan sebelum Future gagal
+        """
+        self.firebase = firebase
+        self.percobaan = percobaan
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='penulis')
+        self.slot = threading.BoundedSemaphore(max_antre)
+        firebase.atur_koneksi(max_workers)
+        
+        # path -> statistik penulisan
+        self.statistik_path = {}
+        self.lock = threading.Lock()
+        self.mulai = time.time()
+    
+    def kirim(self, path, data, metode='push'):
+        """
+        Jadwalkan satu penulisan
+        
+        Args:
+            path: Path di database
+            data: Data (dictionary)
+            metode: 'push' (key baru di bawah path), 'set', atau 'update'
+        
+        Returns:
+            Future; hasilnya key push (untuk 'push') atau path
+        """
+        if metode not in ('push', 'set', 'update'):
+            raise ValueError(f"Metode tidak dikenal: {metode!r}")
+        
+        if metode == 'push' and 'timestamp' not in data:
+            data['timestamp'] = datetime.now().isoformat()
+        key = firebase_lokal.buat_push_id() if metode == 'push' else None
+        
+        self.slot.acquire()
+        try:
+            future = self.pool.submit(self.tulis, path, data, metode, key)
+        except Exception:
+            self.slot.release()
+            raise
+        future.add_done_callback(lambda _: self.slot.release())
+        return future
+    
+    def kirim_sensor(self, sensor_type, value, unit="", location=""):
+        """Versi konkuren dari send_sensor_data"""
+        return self.kirim(f"sensors/{sensor_type}", {
+            'value': value,
+            'unit': unit,
+            'sensor_type': sensor_type,
+            'location': location,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def tulis(self, path, data, metode, key):
+        """Dijalankan di worker: request ke database, diulang sampai percobaan habis"""
+        mulai = time.perf_counter()
+        ref = self.firebase.db.child(path)
+        for ke in range(self.percobaan):
+            try:
+                # Semua metode idempoten (push memakai key tetap), jadi aman diulang
+                if metode == 'push':
+                    ref.child(key).set(data)
+                elif metode == 'set':
+                    ref.set(data)
+                else:
+                    ref.update(data)
+                break
+            except Exception as e:
+                if ke < self.percobaan - 1:
+                    self.catat(path, 0.0, e, ulang=True)
+                    time.sleep(0.1 * (ke + 1))
+                    continue
+                self.catat(path, time.perf_counter() - mulai, e)
+                self.firebase.log.error('kirim_gagal', f"❌ Error mengirim data: {e}", path=path,
+                                        error=str(e), percobaan=self.percobaan)
+                raise
+        self.catat(path, time.perf_counter() - mulai, None)
+        return key if key is not None else path
+    
+    def catat(self, path, durasi, error, ulang=False):
+        with self.lock:
+            stat = self.statistik_path.get(path)
+            if stat is None:
+                stat = self.statistik_path[path] = {'sukses': 0, 'gagal': 0, 'ulang': 0, 'durasi': 0.0,
+                                                    'durasi_max': 0.0, 'error_terakhir': None}
+            if ulang:
+                stat['ulang'] += 1
+                stat['error_terakhir'] = str(error)
+                return
+            if error is None:
+                stat['sukses'] += 1
+            else:
+                stat['gagal'] += 1
+                stat['error_terakhir'] = str(error)
+            stat['durasi'] += durasi
+            stat['durasi_max'] = max(stat['durasi_max'], durasi)
+    
+    def statistik(self):
+        """
+        Statistik per path
+        
+        Returns:
+            Dict path -> sukses, gagal, ulang (jumlah percobaan ulang), per_detik (throughput
+            sejak mulai), rata_ms, max_ms, error_terakhir
+        """
+        lama = max(time.time() - self.mulai, 1e-9)
+        with self.lock:
+            hasil = {}
+            for path, stat in self.statistik_path.items():
+                jumlah = stat['sukses'] + stat['gagal']
+                hasil[path] = {
+                    'sukses': stat['sukses'],
+                    'gagal': stat['gagal'],
+                    'ulang': stat['ulang'],
+                    'per_detik': stat['sukses'] / lama,
+                    'rata_ms': stat['durasi'] / jumlah * 1000 if jumlah else 0.0,
+                    'max_ms': stat['durasi_max'] * 1000,
+                    'error_terakhir': stat['error_terakhir']
+                }
+            return hasil
+    
+    def laporan(self):
+        """Cetak statistik per path"""
+        for path, stat in sorted(self.statistik().items()):
+            print(f"📊 {path}: {stat['sukses']} sukses, {stat['gagal']} gagal, {stat['ulang']} ulang, "
+                  f"{stat['per_detik']:.1f}/detik, rata-rata {stat['rata_ms']:.1f} ms")
+    
+    def tutup(self, wait=True):
+        """Tunggu penulisan yang tersisa lalu hentikan worker"""
+        self.pool.shutdown(wait=wait)
+
+class SensorAgregator:
+    def __init__(self, firebase, window=60.0, raw=False, max_kelompok=1000, path='sensors_agregat',
+                 max_siap=10000, jeda_flush=1.0):
+        """
+        Ringkas data sensor per jendela waktu sebelum dikirim
+        
+        Setiap pasangan (sensor, lokasi) punya satu buffer min/max/jumlah/count untuk jendela
+        yang sedang berjalan; saat jendela selesai, satu record ringkasan dikirim menggantikan
+        semua pembacaan di jendela itu. Semua ringkasan yang siap dikirim dalam satu update.
+        
+        Args:
+            firebase: FirebaseRealtimeDB yang sudah terhubung
+            window: Panjang jendela (detik)
+            raw: Tetap kirim setiap pembacaan mentah lewat send_sensor_data
+            max_kelompok: Jumlah buffer (sensor, lokasi) maksimal; jika penuh, buffer tertua
+                dikirim lebih awal agar memori tetap terbatas
+            path: Path induk record ringkasan (<path>/<sensor_type>/<push_id>)
+            max_siap: Jumlah ringkasan yang menunggu dikirim (misal saat offline); jika penuh,
+                ringkasan tertua dibuang dan dihitung di statistik['dibuang']
+            jeda_flush: Jarak minimal (detik) antar flush yang dipicu catat() tanpa thread latar
+        """
+        self.firebase = firebase
+        self.window = window
+        self.raw = raw
+        self.max_kelompok = max_kelompok
+        self.path = path
+        
+        self.max_siap = max_siap
+        self.jeda_flush = jeda_flush
+        
+        # (sensor_type, location) -> [awal jendela, count, jumlah, min, max, unit]
+        self.buffer = OrderedDict()
+        # (sensor_type, location) -> awal jendela terakhir yang sudah ditutup (terbatas max_kelompok)
+        self.jendela_selesai = OrderedDict()
+        self.siap = deque()
+        self.lock = threading.Lock()
+        self.statistik = {'pembacaan': 0, 'ringkasan': 0, 'request': 0, 'terlambat': 0, 'dibuang': 0}
+        
+        self.thread = None
+        self.stop = threading.Event()
+        self.bangun = threading.Event()
+        self.flush_terakhir = 0.0
+    
+    def catat(self, sensor_type, value, unit="", location="", timestamp=None):
+        """
+        Tambahkan satu pembacaan sensor ke buffer jendelanya
+        
+        Args:
+            sensor_type: Jenis sensor (temperature, humidity, dll)
+            value: Nilai sensor (angka)
+            unit: Satuan
+            location: Lokasi sensor
+            timestamp: Waktu pembacaan (detik epoch, default: sekarang)
+        """
+        if self.raw:
+            self.firebase.send_sensor_data(sensor_type, value, unit, location)
+        
+        timestamp = time.time() if timestamp is None else timestamp
+        awal = timestamp - timestamp % self.window
+        key = (sensor_type, location)
+        
+        with self.lock:
+            self.statistik['pembacaan'] += 1
+            buf = self.buffer.get(key)
+            
+            # Pembacaan terlambat untuk jendela yang sudah ditutup tidak boleh memecah jendela
+            # yang sedang berjalan; dibuang dan dihitung
+            selesai = self.jendela_selesai.get(key)
+            if (buf is not None and awal < buf[0]) or (selesai is not None and awal <= selesai):
+                self.statistik['terlambat'] += 1
+                return
+            
+            # Pembacaan dari jendela baru: jendela lama selesai
+            if buf is not None and awal > buf[0]:
+                self.tutup_jendela(key, buf)
+                del self.buffer[key]
+                buf = None
+            
+            if buf is None:
+                if len(self.buffer) >= self.max_kelompok:
+                    key_lama, buf_lama = self.buffer.popitem(last=False)
+                    self.tutup_jendela(key_lama, buf_lama)
+                self.buffer[key] = [awal, 1, value, value, value, unit]
+            else:
+                buf[1] += 1
+                buf[2] += value
+                if value < buf[3]:
+                    buf[3] = value
+                if value > buf[4]:
+                    buf[4] = value
+        
+        if len(self.siap) >= self.max_kelompok:
+            if self.thread is not None:
+                # Pengiriman dikerjakan thread latar, pemanggil tidak menunggu jaringan
+                self.bangun.set()
+            elif time.time() - self.flush_terakhir >= self.jeda_flush:
+                self.flush()
+    
+    def tutup_jendela(self, key, buf):
+        """Pindahkan buffer jendela yang selesai ke antrean kirim (dipanggil dengan lock)"""
+        self.jendela_selesai[key] = buf[0]
+        self.jendela_selesai.move_to_end(key)
+        if len(self.jendela_selesai) > self.max_kelompok:
+            self.jendela_selesai.popitem(last=False)
+        self.tambah_siap([self.ringkasan(key, buf)])
+    
+    def tambah_siap(self, items, depan=False):
+        """Tambahkan ringkasan ke antrean kirim; yang tertua dibuang jika melebihi max_siap"""
+        if depan:
+            self.siap.extendleft(reversed(items))
+        else:
+            self.siap.extend(items)
+        while len(self.siap) > self.max_siap:
+            self.siap.popleft()
+            self.statistik['dibuang'] += 1
+    
+    def ringkasan(self, key, buf):
+        """Record ringkasan satu jendela"""
+        sensor_type, location = key
+        awal, count, jumlah, nilai_min, nilai_max, unit = buf
+        return sensor_type, {
+            'sensor_type': sensor_type,
+            'location': location,
+            'unit': unit,
+            'window_mulai': datetime.fromtimestamp(awal).isoformat(),
+            'window_detik': self.window,
+            'count': count,
+            'mean': jumlah / count,
+            'min': nilai_min,
+            'max': nilai_max,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def flush(self, semua=False):
+        """
+        Kirim ringkasan jendela yang sudah selesai dalam satu multi-path update
+        
+        Args:
+            semua: Kirim juga jendela yang masih berjalan (misal saat program berhenti)
+        """
+        sekarang = time.time()
+        self.flush_terakhir = sekarang
+        with self.lock:
+            for key in list(self.buffer):
+                buf = self.buffer[key]
+                if semua or sekarang >= buf[0] + self.window:
+                    self.tutup_jendela(key, buf)
+                    del self.buffer[key]
+            siap, self.siap = list(self.siap), deque()
+        
+        if not siap:
+            return True
+        
+        update = {f"{self.path}/{sensor_type}/{firebase_lokal.buat_push_id()}": record
+                  for sensor_type, record in siap}
+        try:
+            self.firebase.db.update(update)
+        except Exception as e:
+            # Kembalikan ke antrean (tetap dibatasi max_siap) agar dicoba lagi pada flush berikutnya
+            with self.lock:
+                self.tambah_siap(siap, depan=True)
+            self.firebase.log.error('agregat_gagal', f"❌ Error mengirim ringkasan sensor: {e}",
+                                    jumlah=len(siap), error=str(e))
+            return False
+        
+        self.statistik['ringkasan'] += len(siap)
+        self.statistik['request'] += 1
+        self.firebase.log.info('agregat', f"✅ {len(siap)} ringkasan sensor dikirim ke {self.path}",
+                               jumlah=len(siap))
+        return True
+    
+    def mulai(self, interval=None):
+        """Flush otomatis di thread latar setiap interval detik (default: seperempat jendela)"""
+        if self.thread is not None:
+            return
+        interval = interval or max(0.5, self.window / 4)
+        
+        def loop():
+            while not self.stop.is_set():
+                self.bangun.wait(interval)
+                self.bangun.clear()
+                if self.stop.is_set():
+                    break
+                self.flush()
+        
+        self.stop.clear()
+        self.bangun.clear()
+        self.thread = threading.Thread(target=loop, daemon=True)
+        self.thread.start()
+    
+    def tutup(self):
+        """Hentikan flush otomatis dan kirim semua buffer"""
+        if self.thread is not None:
+            self.stop.set()
+            self.bangun.set()
+            self.thread.join()
+            self.thread = None
+        return self.flush(semua=True)
+
 # Contoh penggunaan
 def main():
     # Konfigurasi - GANTI DENGAN KONFIGURASI ANDA
@@ -153,21 +559,24 @@ def main():
         
         firebase.send_multiple_data("sensor_readings", readings)
         
-        # Contoh 4: Simulasi data sensor real-time
+        # Contoh 4: Simulasi data sensor real-time, diringkas per jendela 5 detik
+        # (satu record min/max/mean per sensor, bukan satu record per pembacaan)
         print("\n4. Simulasi data sensor real-time (5 detik):")
+        agregator = SensorAgregator(firebase, window=5.0)
+        agregator.mulai()
         for i in range(5):
             # Data simulasi
             temp = 25 + (i * 0.5)
             humid = 60 - (i * 1)
             
-            firebase.send_sensor_data(
+            agregator.catat(
                 sensor_type="temperature",
                 value=temp,
                 unit="°C",
                 location="Greenhouse"
             )
             
-            firebase.send_sensor_data(
+            agregator.catat(
                 sensor_type="humidity",
                 value=humid,
                 unit="%",
@@ -176,6 +585,7 @@ def main():
             
             print(f"📈 Iterasi {i+1}: Temperature={temp}°C, Humidity={humid}%")
             time.sleep(1)  # Tunggu 1 detik
+        agregator.tutup()
         
         print("\n🎉 Semua data berhasil dikirim!")
         
@@ -0,0 +1,519 @@
+import copy
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+# Pengganti lokal Firebase Realtime Database untuk pengujian dan benchmark.
+# API mengikuti firebase_admin.db.Reference yang dipakai di FinishMode.py dan firebase.py,
+# dipilih lewat URL database dengan skema lokal://, contoh:
+#   lokal://gudang?latency=0.005&jitter=0.002&failure_rate=0.01&gagal_setelah=0.5&seed=1
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+KARAKTER_TERLARANG = set('.$#[]/')
+
+_push_lock = threading.Lock()
+_push_last_time = 0
+_push_last_random = [0] * 12
+
+def buat_push_id(timestamp_ms=None):
+    """
+    Membuat push ID gaya Firebase secara lokal (urut waktu, unik)
+
+    Args:
+        timestamp_ms: Waktu dalam milidetik epoch (default: sekarang)
+    """
+    global _push_last_time, _push_last_random
+
+    now = int(time.time() * 1000) if timestamp_ms is None else int(timestamp_ms)
+    with _push_lock:
+        if now == _push_last_time:
+            # Waktu sama: naikkan bagian acak agar tetap urut dan unik
+            for i in range(11, -1, -1):
+                if _push_last_random[i] < 63:
+                    _push_last_random[i] += 1
+                    break
+                _push_last_random[i] = 0
+        else:
+            _push_last_time = now
+            _push_last_random = [random.randrange(64) for _ in range(12)]
+        random_part = list(_push_last_random)
+
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[now % 64])
+        now //= 64
+    return ''.join(reversed(time_chars)) + ''.join(PUSH_CHARS[i] for i in random_part)
+
+class KegagalanSimulasi(Exception):
+    """Error yang disuntikkan oleh database lokal (meniru timeout/koneksi putus)"""
+
+class TransactionAbortedError(Exception):
+    """Transaksi gagal setelah semua percobaan ulang"""
+
+def pecah_path(path):
+    """Pecah path 'a/b/c' menjadi list segmen, tolak karakter yang dilarang Firebase"""
+    segments = [seg for seg in str(path).split('/') if seg]
+    for seg in segments:
+        if KARAKTER_TERLARANG & set(seg):
+            raise ValueError(f'Key tidak valid untuk Firebase: {seg!r}')
+    return segments
+
+def rapikan(value):
+    """Normalisasi seperti server: dict kosong dan None dihapus"""
+    if isinstance(value, dict):
+        hasil = {}
+        for key, child in value.items():
+            child = rapikan(child)
+            if child is not None:
+                hasil[str(key)] = child
+        return hasil or None
+    return value
+
+def urutan_key(key):
+    """Urutan key Firebase: key integer 32-bit lebih dulu (numerik), lalu string leksikografis"""
+    key = str(key)
+    try:
+        angka = int(key)
+        if str(angka) == key and -2 ** 31 <= angka < 2 ** 31:
+            return (0, angka, '')
+    except ValueError:
+        pass
+    return (1, 0, key)
+
+def urutan_nilai(value):
+    """Urutan nilai Firebase: null < false < true < angka < string < objek"""
+    if value is None:
+        return (0, 0)
+    if value is False:
+        return (1, 0)
+    if value is True:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
+
+class Event:
+    def __init__(self, event_type, path, data):
+        """Event realtime, sama seperti firebase_admin.db.Event"""
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+class ListenerRegistration:
+    def __init__(self, database, path, callback):
+        """Listener aktif; callback dipanggil dari thread sendiri seperti SDK asli"""
+        self._database = database
+        self._path = path
+        self._callback = callback
+        self._queue = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._start_listen, daemon=True)
+        self._thread.start()
+
+    def _kirim(self, event):
+        with self._cond:
+            self._queue.append(event)
+            self._cond.notify()
+
+    def _start_listen(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                event = self._queue.pop(0)
+            self._callback(event)
+
+    def close(self):
+        """Hentikan listener"""
+        self._database._hapus_listener(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+class LocalDatabase:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, gagal_setelah=0.0, seed=None):
+        """
+        Database lokal di memori
+
+        Args:
+            latency: Latensi tetap per request (detik)
+            jitter: Tambahan latensi acak maksimal (detik)
+            failure_rate: Peluang sebuah request gagal
+            gagal_setelah: Porsi kegagalan yang terjadi setelah data tersimpan
+                (meniru timeout setelah server sudah commit)
+            seed: Seed random agar kegagalan bisa diulang
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.gagal_setelah = gagal_setelah
+        self.random = random.Random(seed)
+
+        self.root = None
+        self.lock = threading.RLock()
+        self.listeners = []
+
+        # Statistik request per jenis operasi
+        self.statistik = {}
+        self.gagal = 0
+
+    def _request(self, operasi):
+        """Simulasikan round trip jaringan; return True jika gagal setelah commit"""
+        with self.lock:
+            self.statistik[operasi] = self.statistik.get(operasi, 0) + 1
+            gagal = self.failure_rate and self.random.random() < self.failure_rate
+            setelah = gagal and self.random.random() < self.gagal_setelah
+            delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0.0)
+
+        if delay > 0:
+            time.sleep(delay)
+        if gagal and not setelah:
+            with self.lock:
+                self.gagal += 1
+            raise KegagalanSimulasi(f'Kegagalan simulasi pada {operasi}')
+        return bool(setelah)
+
+    def _gagal_setelah_commit(self, operasi):
+        with self.lock:
+            self.gagal += 1
+        raise KegagalanSimulasi(f'Timeout simulasi setelah {operasi} tersimpan')
+
+    def baca(self, segments):
+        """Nilai di path (referensi internal, jangan diubah)"""
+        node = self.root
+        for seg in segments:
+            if not isinstance(node, dict) or seg not in node:
+                return None
+            node = node[seg]
+        return node
+
+    def _nilai_server(self, value, current):
+        """Terapkan server value {'.sv': ...} seperti RTDB"""
+        if isinstance(value, dict):
+            if '.sv' in value and len(value) == 1:
+                sv = value['.sv']
+                if sv == 'timestamp':
+                    return int(time.time() * 1000)
+                if isinstance(sv, dict) and 'increment' in sv:
+                    base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+                    return base + sv['increment']
+                raise ValueError(f'Server value tidak dikenal: {sv!r}')
+            return {key: self._nilai_server(child, current.get(key) if isinstance(current, dict) else None)
+                    for key, child in value.items()}
+        return value
+
+    def tulis(self, segments, value):
+        """Tulis nilai di path (dipanggil dengan lock), None berarti hapus"""
+        value = rapikan(self._nilai_server(value, self.baca(segments)))
+
+        if not segments:
+            self.root = value
+            return
+
+        if not isinstance(self.root, dict):
+            self.root = {}
+        node = self.root
+        parents = []
+        for seg in segments[:-1]:
+            child = node.get(seg)
+            if not isinstance(child, dict):
+                child = {}
+                node[seg] = child
+            parents.append((node, seg))
+            node = child
+
+        if value is None:
+            node.pop(segments[-1], None)
+        else:
+            node[segments[-1]] = value
+
+        # Node induk yang menjadi kosong ikut hilang
+        for parent, seg in reversed(parents):
+            if parent[seg]:
+                break
+            del parent[seg]
+        if not self.root:
+            self.root = None
+
+    def _beri_tahu(self, segments_list):
+        """Kirim event ke listener yang path-nya terpengaruh"""
+        for registration in list(self.listeners):
+            path = registration._path
+            for segments in segments_list:
+                n = min(len(path), len(segments))
+                if path[:n] == segments[:n]:
+                    data = copy.deepcopy(self.baca(path))
+                    registration._kirim(Event('put', '/', data))
+                    break
+
+    def _tambah_listener(self, path, callback):
+        registration = ListenerRegistration(self, path, callback)
+        with self.lock:
+            self.listeners.append(registration)
+            data = copy.deepcopy(self.baca(path))
+        registration._kirim(Event('put', '/', data))
+        return registration
+
+    def _hapus_listener(self, registration):
+        with self.lock:
+            if registration in self.listeners:
+                self.listeners.remove(registration)
+
+class Reference:
+    def __init__(self, database, path=''):
+        """Reference ke sebuah path, API sama seperti firebase_admin.db.Reference"""
+        self._database = database
+        self._segments = pecah_path(path)
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return '/' + '/'.join(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return Reference(self._database, '/'.join(self._segments[:-1]))
+
+    def child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f'Path child tidak valid: {path!r}')
+        return Reference(self._database, '/'.join(self._segments + pecah_path(path)))
+
+    @staticmethod
+    def _etag(value):
+        return hashlib.md5(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _salin(value):
+        # Round trip JSON meniru serialisasi ke server dan menolak tipe yang tidak valid
+        return json.loads(json.dumps(value))
+
+    def get(self, etag=False, shallow=False):
+        self._database._request('get')
+        with self._database.lock:
+            value = self._database.baca(self._segments)
+            if shallow and isinstance(value, dict):
+                value = {key: True if isinstance(child, dict) else child for key, child in value.items()}
+            else:
+                value = copy.deepcopy(value)
+        if etag:
+            return value, self._etag(value)
+        return value
+
+    def set(self, value):
+        if value is None:
+            raise ValueError('Value tidak boleh None.')
+        value = self._salin(value)
+        setelah = self._database._request('set')
+        with self._database.lock:
+            self._database.tulis(self._segments, value)
+            self._database._beri_tahu([self._segments])
+        if setelah:
+            self._database._gagal_setelah_commit('set')
+
+    def set_if_unchanged(self, expected_etag, value):
+        value = self._salin(value)
+        setelah = self._database._request('set_if_unchanged')
+        with self._database.lock:
+            current = copy.deepcopy(self._database.baca(self._segments))
+            if self._etag(current) != expected_etag:
+                return False, current, self._etag(current)
+            self._database.tulis(self._segments, value)
+            self._database._beri_tahu([self._segments])
+            stored = copy.deepcopy(self._database.baca(self._segments))
+        if setelah:
+            self._database._gagal_setelah_commit('set_if_unchanged')
+        return True, stored, self._etag(stored)
+
+    def push(self, value=''):
+        key = buat_push_id()
+        ref = self.child(key)
+        if value:
+            ref.set(value)
+        return ref
+
+    def update(self, value):
+        if not value or not isinstance(value, dict):
+            raise ValueError('Value argument must be a non-empty dictionary.')
+        if None in value.keys():
+            raise ValueError('Dictionary must not contain None keys.')
+        value = self._salin(value)
+        targets = [(self._segments + pecah_path(path), child) for path, child in value.items()]
+        setelah = self._database._request('update')
+
+        # Multi-path update bersifat atomik: semua path ditulis dalam satu lock
+        with self._database.lock:
+            for segments, child in targets:
+                self._database.tulis(segments, child)
+            self._database._beri_tahu([segments for segments, _ in targets])
+        if setelah:
+            self._database._gagal_setelah_commit('update')
+
+    def delete(self):
+        setelah = self._database._request('delete')
+        with self._database.lock:
+            self._database.tulis(self._segments, None)
+            self._database._beri_tahu([self._segments])
+        if setelah:
+            self._database._gagal_setelah_commit('delete')
+
+    def transaction(self, transaction_update):
+        if not callable(transaction_update):
+            raise ValueError('transaction_update must be a function.')
+
+        # Algoritma sama dengan SDK: baca dengan etag, tulis jika belum berubah, ulangi
+        tries = 0
+        data, etag = self.get(etag=True)
+        while tries < 25:
+            new_data = transaction_update(data)
+            success, data, etag = self.set_if_unchanged(etag, new_data)
+            if success:
+                return new_data
+            tries += 1
+
+        raise TransactionAbortedError('Transaction aborted after failed retries.')
+
+    def listen(self, callback):
+        self._database._request('listen')
+        return self._database._tambah_listener(list(self._segments), callback)
+
+    def order_by_key(self):
+        return Query(self, 'key')
+
+    def order_by_value(self):
+        return Query(self, 'value')
+
+    def order_by_child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f'Path child tidak valid: {path!r}')
+        return Query(self, 'child', pecah_path(path))
+
+class Query:
+    def __init__(self, reference, order_by, child_path=None):
+        """Query terurut, API sama seperti firebase_admin.db.Query"""
+        self._reference = reference
+        self._order_by = order_by
+        self._child_path = child_path or []
+        self._start = None
+        self._end = None
+        self._limit_first = None
+        self._limit_last = None
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def equal_to(self, value):
+        self._start = value
+        self._end = value
+        return self
+
+    def limit_to_first(self, limit):
+        self._limit_first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._limit_last = limit
+        return self
+
+    def _nilai_urut(self, key, child):
+        if self._order_by == 'key':
+            return urutan_key(key)
+        if self._order_by == 'value':
+            return urutan_nilai(child)
+        node = child
+        for seg in self._child_path:
+            node = node.get(seg) if isinstance(node, dict) else None
+        return urutan_nilai(node)
+
+    def _batas(self, value):
+        return urutan_key(value) if self._order_by == 'key' else urutan_nilai(value)
+
+    def get(self):
+        database = self._reference._database
+        database._request('query')
+        with database.lock:
+            value = database.baca(self._reference._segments)
+            if not isinstance(value, dict):
+                return OrderedDict()
+            items = [(self._nilai_urut(key, child), urutan_key(key), key, child)
+                     for key, child in value.items()]
+
+            items.sort(key=lambda item: (item[0], item[1]))
+            if self._start is not None:
+                start = self._batas(self._start)
+                items = [item for item in items if item[0] >= start]
+            if self._end is not None:
+                end = self._batas(self._end)
+                items = [item for item in items if item[0] <= end]
+            if self._limit_first is not None:
+                items = items[:self._limit_first]
+            if self._limit_last is not None:
+                items = items[-self._limit_last:]
+
+            return OrderedDict((key, copy.deepcopy(child)) for _, _, key, child in items)
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def reference(database_url):
+    """
+    Reference root untuk URL lokal://nama?opsi; URL dengan nama sama memakai database yang sama
+
+    Args:
+        database_url: URL database lokal, contoh 'lokal://gudang?latency=0.005'
+    """
+    parsed = urlparse(database_url)
+    if parsed.scheme != 'lokal':
+        raise ValueError(f'URL database lokal harus berskema lokal://: {database_url}')
+
+    options = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    name = parsed.netloc or 'default'
+
+    with _databases_lock:
+        database = _databases.get(name)
+        if database is None:
+            database = LocalDatabase(
+                latency=float(options.get('latency', 0.0)),
+                jitter=float(options.get('jitter', 0.0)),
+                failure_rate=float(options.get('failure_rate', 0.0)),
+                gagal_setelah=float(options.get('gagal_setelah', 0.0)),
+                seed=int(options['seed']) if 'seed' in options else None
+            )
+            _databases[name] = database
+    return Reference(database)
+
+def database(database_url):
+    """Objek LocalDatabase di balik URL lokal (untuk mengatur latensi/kegagalan dan membaca statistik)"""
+    return reference(database_url)._database
+
+def hapus_database(name=None):
+    """Hapus database lokal bernama name, atau semuanya jika name None"""
+    with _databases_lock:
+        if name is None:
+            _databases.clear()
+        else:
+            _databases.pop(name, None)
+
+def adalah_url_lokal(database_url):
+    """Cek apakah URL database menunjuk ke database lokal"""
+    return str(database_url).startswith('lokal://')
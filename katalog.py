@@ -0,0 +1,135 @@
+import csv
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+# Katalog barang lokal: isi QR -> nama barang, kategori, dan bin tujuan.
+# Dimuat sekali saat startup dari CSV atau SQLite, sehingga overlay bisa menampilkan
+# nama barang tanpa request jaringan di loop frame.
+
+ItemKatalog = namedtuple('ItemKatalog', ['nama', 'kategori', 'bin'])
+
+# Nama kolom yang dikenali (huruf kecil) untuk setiap field
+KOLOM_QR = ('qr', 'qr_data', 'kode', 'sku')
+KOLOM_NAMA = ('nama', 'nama_barang', 'name')
+KOLOM_KATEGORI = ('kategori', 'category')
+KOLOM_BIN = ('bin', 'lokasi', 'tujuan', 'rak')
+
+def cari_kolom(header, pilihan):
+    """Nama kolom asli di header yang cocok dengan salah satu pilihan"""
+    for nama in header:
+        if nama and nama.strip().lower() in pilihan:
+            return nama
+    return None
+
+class KatalogBarang:
+    def __init__(self, path=None, preload=True, cache_size=4096, tabel='barang'):
+        """
+        Indeks katalog barang di memori
+
+        Args:
+            path: File katalog (.csv, atau .db/.sqlite/.sqlite3); None untuk katalog kosong
+            preload: Muat semua item saat startup; False untuk SQLite berarti item dibaca
+                per QR saat pertama dicari (hasilnya di-cache)
+            cache_size: Jumlah hasil lookup SQLite yang disimpan saat preload=False
+            tabel: Nama tabel SQLite dengan kolom qr, nama, kategori, bin
+        """
+        self.path = path
+        self.tabel = tabel
+        self.items = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.conn = None
+        self.lock = threading.Lock()
+
+        if not path:
+            return
+        if not os.path.exists(path):
+            print(f"⚠ Katalog tidak ditemukan: {path}")
+            return
+
+        try:
+            if path.lower().endswith('.csv'):
+                self.muat_csv(path)
+            elif preload:
+                self.muat_sqlite(path)
+            else:
+                self.conn = sqlite3.connect(path, check_same_thread=False)
+                print(f"✅ Katalog SQLite dibuka (lookup per QR): {path}")
+                return
+            print(f"✅ Katalog dimuat: {len(self.items)} barang dari {path}")
+        except Exception as e:
+            print(f"❌ Error memuat katalog: {e}")
+
+    def tambah(self, qr, nama, kategori, bin_tujuan):
+        """Simpan satu item; string berulang (kategori, bin) di-intern agar hemat memori"""
+        if not qr:
+            return
+        self.items[sys.intern(qr.strip())] = ItemKatalog(
+            nama.strip() if nama else '',
+            sys.intern(kategori.strip()) if kategori else '',
+            sys.intern(bin_tujuan.strip()) if bin_tujuan else ''
+        )
+
+    def muat_csv(self, path):
+        """Muat katalog dari CSV dengan header (kolom qr/kode, nama, kategori, bin)"""
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            idx = [header.index(k) if k is not None else None for k in (
+                cari_kolom(header, KOLOM_QR), cari_kolom(header, KOLOM_NAMA),
+                cari_kolom(header, KOLOM_KATEGORI), cari_kolom(header, KOLOM_BIN))]
+            if idx[0] is None:
+                raise ValueError(f"Kolom QR tidak ditemukan di {path}")
+
+            for row in reader:
+                nilai = [row[i] if i is not None and i < len(row) else '' for i in idx]
+                self.tambah(*nilai)
+
+    def muat_sqlite(self, path):
+        """Muat seluruh tabel katalog dari SQLite"""
+        conn = sqlite3.connect(path)
+        try:
+            query = f"SELECT qr, nama, kategori, bin FROM {self.tabel}"
+            for qr, nama, kategori, bin_tujuan in conn.execute(query):
+                self.tambah(qr, nama, kategori, bin_tujuan)
+        finally:
+            conn.close()
+
+    def cari(self, qr_data):
+        """Item katalog untuk isi QR, atau None jika tidak terdaftar"""
+        item = self.items.get(qr_data)
+        if item is not None or self.conn is None:
+            return item
+
+        # Mode tanpa preload: baca dari SQLite sekali per QR, termasuk hasil kosong
+        with self.lock:
+            if qr_data in self.cache:
+                self.cache.move_to_end(qr_data)
+                return self.cache[qr_data]
+
+            row = self.conn.execute(
+                f"SELECT nama, kategori, bin FROM {self.tabel} WHERE qr = ?", (qr_data,)
+            ).fetchone()
+            item = ItemKatalog(*(v or '' for v in row)) if row else None
+
+            self.cache[qr_data] = item
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return item
+
+    def label(self, qr_data, max_len=15):
+        """Teks tampilan: nama barang jika terdaftar, jika tidak isi QR; dipotong max_len"""
+        item = self.cari(qr_data)
+        text = item.nama if item is not None and item.nama else qr_data
+        return text[:max_len] + "..." if len(text) > max_len else text
+
+    def __len__(self):
+        return len(self.items)
+
+    def tutup(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,246 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+# Log event terstruktur (JSONL) tanpa I/O di thread pemanggil.
+# catat() hanya memasukkan tuple ke antrean; format JSON, tulis file, rotasi, dan cetak
+# ke konsol dikerjakan oleh satu thread penulis. Jika antrean penuh, event dibuang dan
+# dihitung, sehingga loop frame tidak pernah menunggu disk atau konsol. Event yang datang
+# setelah logger ditutup (dari thread latar yang belum berhenti) ditulis langsung ke stderr.
+
+LEVEL = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+class LogEvent:
+    def __init__(self, path=None, level='INFO', max_bytes=10 * 1024 * 1024, backup=5,
+                 konsol=True, kapasitas=10000):
+        """
+        Logger event berbasis antrean
+
+        Args:
+            path: File JSONL; None untuk konsol saja
+            level: Level minimum yang dicatat ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+            max_bytes: Ukuran file sebelum dirotasi (path -> path.1 -> path.2 ...)
+            backup: Jumlah file rotasi yang disimpan
+            konsol: Cetak ringkasan event ke konsol (dari thread penulis)
+            kapasitas: Ukuran antrean; event di luar kapasitas dibuang
+        """
+        self.path = path
+        self.level = LEVEL[level]
+        self.max_bytes = max_bytes
+        self.backup = backup
+        self.konsol = konsol
+        self.antrean = queue.Queue(maxsize=kapasitas)
+        self.dibuang = 0
+        self.file = None
+        self.ditutup = False
+
+        if path:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+        self.thread = threading.Thread(target=self.penulis, daemon=True)
+        self.thread.start()
+
+    def catat(self, level, event, pesan=None, **data):
+        """
+        Catat satu event (murah: tanpa format dan tanpa I/O)
+
+        Args:
+            level: 'DEBUG', 'INFO', 'WARNING', atau 'ERROR'
+            event: Nama event, misal 'scan' atau 'kirim_gagal'
+            pesan: Teks untuk konsol, dengan gaya print yang lama (opsional)
+            **data: Field tambahan yang ikut ditulis ke JSONL
+        """
+        if LEVEL[level] < self.level:
+            return
+        item = (time.time(), level, event, pesan, data)
+        if self.ditutup:
+            self.tulis_stderr(item)
+            return
+        try:
+            self.antrean.put_nowait(item)
+        except queue.Full:
+            self.dibuang += 1
+
+    def debug(self, event, pesan=None, **data):
+        self.catat('DEBUG', event, pesan, **data)
+
+    def info(self, event, pesan=None, **data):
+        self.catat('INFO', event, pesan, **data)
+
+    def warning(self, event, pesan=None, **data):
+        self.catat('WARNING', event, pesan, **data)
+
+    def error(self, event, pesan=None, **data):
+        self.catat('ERROR', event, pesan, **data)
+
+    def penulis(self):
+        """Thread penulis: ambil event per kelompok, tulis, rotasi bila perlu"""
+        while True:
+            item = self.antrean.get()
+            if item is None:
+                break
+            kelompok = [item]
+            selesai = False
+            while len(kelompok) < 500:
+                try:
+                    item = self.antrean.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    selesai = True
+                    break
+                kelompok.append(item)
+
+            try:
+                self.tulis(kelompok)
+            except Exception as e:
+                print(f"❌ Error menulis log: {e}")
+
+            if selesai:
+                break
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def tulis(self, kelompok):
+        """Tulis sekelompok event ke file dan konsol"""
+        baris = []
+        for waktu, level, event, pesan, data in kelompok:
+            if self.konsol and pesan:
+                print(pesan)
+            if self.path:
+                record = {'t': round(waktu, 3), 'level': level, 'event': event}
+                if pesan:
+                    record['pesan'] = pesan
+                record.update(data)
+                baris.append(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str))
+
+        if not baris:
+            return
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write('\n'.join(baris) + '\n')
+        self.file.flush()
+
+        if self.file.tell() >= self.max_bytes:
+            self.rotasi()
+
+    def tulis_stderr(self, item):
+        """Tulis satu event langsung ke stderr (logger sudah ditutup)"""
+        waktu, level, event, pesan, data = item
+        record = {'t': round(waktu, 3), 'level': level, 'event': event}
+        if pesan:
+            record['pesan'] = pesan
+        record.update(data)
+        print(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str), file=sys.stderr)
+
+    def rotasi(self):
+        """path -> path.1, path.1 -> path.2, ...; yang tertua dihapus"""
+        self.file.close()
+        self.file = None
+        for i in range(self.backup - 1, 0, -1):
+            lama = f"{self.path}.{i}"
+            if os.path.exists(lama):
+                os.replace(lama, f"{self.path}.{i + 1}")
+        if self.backup > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def tutup(self, timeout=2.0):
+        """Tulis sisa antrean lalu hentikan thread penulis; event berikutnya ke stderr"""
+        self.ditutup = True
+        if not self.thread.is_alive():
+            return
+        try:
+            self.antrean.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout=timeout)
+        if self.thread.is_alive():
+            return
+
+        # Event yang masuk bersamaan dengan penutupan tertinggal di belakang penanda akhir
+        while True:
+            try:
+                item = self.antrean.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.tulis_stderr(item)
+
+def replay(path, event=None, level=None, mulai=None, selesai=None):
+    """
+    Baca ulang log (termasuk file rotasi, dari yang tertua) untuk analitik
+
+    Args:
+        path: File log utama
+        event: Hanya event dengan nama ini (atau salah satu dari list/tuple)
+        level: Level minimum
+        mulai, selesai: Rentang waktu (detik epoch)
+
+    Yields:
+        Dict per event
+    """
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+
+    nama_event = (event,) if isinstance(event, str) else event
+    level_min = LEVEL[level] if level else 0
+
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if nama_event and record.get('event') not in nama_event:
+                    continue
+                if LEVEL.get(record.get('level'), 0) < level_min:
+                    continue
+                if mulai is not None and record.get('t', 0) < mulai:
+                    continue
+                if selesai is not None and record.get('t', 0) > selesai:
+                    continue
+                yield record
+
+# Logger bersama untuk satu proses; diatur sekali oleh main() lewat atur()
+_default = None
+_default_lock = threading.Lock()
+
+def atur(**opsi):
+    """Ganti logger bersama dengan konfigurasi baru (lihat LogEvent)"""
+    global _default
+    with _default_lock:
+        if _default is not None:
+            _default.tutup()
+        _default = LogEvent(**opsi)
+        return _default
+
+@atexit.register
+def _tutup_default():
+    """Pastikan sisa antrean logger bersama tertulis saat proses selesai"""
+    if _default is not None:
+        _default.tutup()
+
+def default():
+    """Logger bersama; jika belum diatur, logger konsol saja"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LogEvent()
+        return _default
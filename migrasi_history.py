@@ -0,0 +1,94 @@
+import argparse
+
+from FinishMode import FirebaseManager, baca_record, nama_bucket, waktu_push_id
+
+# Migrasi history datar lama (barang_*/history/<push_id>) ke layout bucket per hari/jam
+# (barang_*/history/<YYYY-MM-DD>[/<HH>]/<push_id>). Data dipindah per potongan kecil:
+# setiap potongan ditulis ke bucket dan dihapus dari lokasi lama dalam satu update atomik,
+# sehingga migrasi bisa dihentikan dan dijalankan ulang kapan saja.
+
+# Push ID Firebase diawali '-', sedangkan nama bucket diawali angka tahun
+AKHIR_KEY_LAMA = '-\uf8ff'
+
+def waktu_record(key, record, mode):
+    """Waktu event dari isi record (v1 atau v2), atau dari push ID jika tidak ada"""
+    hasil = baca_record(record, mode)
+    if hasil and hasil['waktu'] is not None:
+        return hasil['waktu']
+    return waktu_push_id(key)
+
+def migrasi_mode(firebase, mode, chunk=500, shard='hari', dry_run=False):
+    """
+    Pindahkan history datar satu mode ke bucket
+
+    Args:
+        firebase: FirebaseManager yang sudah terhubung
+        mode: 'masuk' atau 'keluar'
+        chunk: Jumlah record per potongan
+        shard: 'hari' atau 'jam'
+        dry_run: Hanya hitung, tanpa menulis
+
+    Returns:
+        Jumlah record yang dipindah
+    """
+    history_ref = firebase.db.child(f"barang_{mode}").child('history')
+    dipindah = 0
+    start_key = None
+
+    while True:
+        query = history_ref.order_by_key()
+        if start_key is not None:
+            query = query.start_at(start_key)
+        page = query.end_at(AKHIR_KEY_LAMA).limit_to_first(chunk + (1 if start_key else 0)).get()
+
+        items = [(key, record) for key, record in page.items() if key != start_key]
+        if not items:
+            break
+
+        update = {}
+        for key, record in items:
+            waktu = waktu_record(key, record, mode)
+            if waktu is None:
+                print(f"⚠ Record {key} dilewati: waktu tidak diketahui")
+                continue
+            update[f"{nama_bucket(waktu, shard)}/{key}"] = record
+            update[key] = None
+
+        if dry_run:
+            # Tanpa penghapusan, halaman berikutnya dimulai setelah key terakhir
+            start_key = items[-1][0]
+        elif update:
+            history_ref.update(update)
+        else:
+            start_key = items[-1][0]
+
+        dipindah += sum(1 for path in update if '/' in path)
+        print(f"   barang_{mode}: {dipindah} record {'akan dipindah' if dry_run else 'dipindah'}")
+
+    return dipindah
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi history datar ke layout bucket per hari/jam")
+    parser.add_argument('--url', required=True, help="URL database (Firebase atau lokal://)")
+    parser.add_argument('--credential', default=None, help="Path service account")
+    parser.add_argument('--mode', choices=['masuk', 'keluar', 'semua'], default='semua')
+    parser.add_argument('--shard', choices=['hari', 'jam'], default='hari')
+    parser.add_argument('--chunk', type=int, default=500, help="Record per potongan")
+    parser.add_argument('--dry-run', action='store_true', help="Hanya hitung, tanpa menulis")
+    args = parser.parse_args()
+
+    firebase = FirebaseManager(args.credential, args.url, history_shard=args.shard)
+    if not firebase.db:
+        print("❌ Database tidak tersedia")
+        return
+
+    modes = ['masuk', 'keluar'] if args.mode == 'semua' else [args.mode]
+    total = 0
+    for mode in modes:
+        print(f"\n📦 Migrasi barang_{mode}/history ke bucket per {args.shard}")
+        total += migrasi_mode(firebase, mode, args.chunk, args.shard, args.dry_run)
+
+    print(f"\n✅ Selesai: {total} record {'akan dipindah' if args.dry_run else 'dipindah'}")
+
+if __name__ == "__main__":
+    main()
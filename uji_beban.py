@@ -0,0 +1,274 @@
+import argparse
+import random
+import threading
+import time
+from collections import deque
+
+from FinishMode import FirebaseManager
+
+# Generator beban untuk lapisan penyimpanan (FirebaseManager).
+# Memutar ulang aliran scan yang realistis lewat send_barang_masuk dan send_barang_keluar,
+# lalu melaporkan throughput, latensi ekor, dan apakah counter total/ringkasan tetap tepat.
+
+def persentil(data, p):
+    """Persentil p (0-100) dari list yang sudah terurut"""
+    if not data:
+        return 0.0
+    idx = min(len(data) - 1, max(0, int(round(p / 100.0 * (len(data) - 1)))))
+    return data[idx]
+
+class AliranScan:
+    def __init__(self, station_index, payload_unik=500, rasio_ulang=0.3, pola_mode='acak',
+                 rasio_keluar=0.4, seed=None):
+        """
+        Pembangkit urutan scan untuk satu stasiun
+
+        Args:
+            station_index: Nomor stasiun (untuk membedakan payload antar stasiun)
+            payload_unik: Jumlah payload berbeda yang mungkin muncul
+            rasio_ulang: Peluang scan mengulang payload yang baru saja discan
+            pola_mode: 'acak', 'selang-seling', 'masuk', atau 'keluar'
+            rasio_keluar: Peluang mode keluar pada pola 'acak'
+            seed: Seed random
+        """
+        self.station_index = station_index
+        self.payload_unik = payload_unik
+        self.rasio_ulang = rasio_ulang
+        self.pola_mode = pola_mode
+        self.rasio_keluar = rasio_keluar
+        self.random = random.Random(seed)
+        self.recent = deque(maxlen=20)
+        self.urutan = 0
+
+    def berikutnya(self):
+        """Return (qr_data, mode) untuk scan berikutnya"""
+        if self.recent and self.random.random() < self.rasio_ulang:
+            qr_data = self.random.choice(self.recent)
+        else:
+            qr_data = f"BRG-{self.random.randrange(self.payload_unik):06d}"
+            self.recent.append(qr_data)
+
+        if self.pola_mode == 'selang-seling':
+            mode = 'masuk' if self.urutan % 2 == 0 else 'keluar'
+        elif self.pola_mode in ('masuk', 'keluar'):
+            mode = self.pola_mode
+        else:
+            mode = 'keluar' if self.random.random() < self.rasio_keluar else 'masuk'
+
+        self.urutan += 1
+        return qr_data, mode
+
+class Stasiun(threading.Thread):
+    def __init__(self, index, database_url, credential_path, rate, burst, durasi, aliran,
+                 counter_shard=False):
+        """
+        Satu stasiun dok yang mengirim scan dengan jadwal open-loop
+
+        Args:
+            index: Nomor stasiun
+            database_url: URL database (lokal:// atau Firebase)
+            credential_path: Path service account (diabaikan untuk lokal://)
+            rate: Rata-rata scan per detik untuk stasiun ini
+            burst: Rata-rata jumlah scan per burst (1 = Poisson biasa)
+            durasi: Lama pengujian (detik)
+            aliran: AliranScan untuk stasiun ini
+            counter_shard: Gunakan counter per stasiun (penghitung/<stasiun>)
+        """
+        super().__init__(daemon=True)
+        self.index = index
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.durasi = durasi
+        self.aliran = aliran
+        self.random = random.Random(index)
+        self.firebase = FirebaseManager(credential_path, database_url, station_id=f"uji-{index:02d}",
+                                        counter_shard=counter_shard)
+
+        # Hasil per event
+        self.latensi_layanan = []   # durasi panggilan send_barang_*
+        self.latensi_respon = []    # dari jadwal kedatangan sampai selesai (termasuk antre)
+        self.sukses = {'masuk': 0, 'keluar': 0}
+        self.gagal = {'masuk': 0, 'keluar': 0}
+        self.tertunda = {'masuk': 0, 'keluar': 0}
+
+    def jadwal(self, mulai):
+        """Waktu kedatangan scan: burst dengan ukuran geometrik, jeda antar burst eksponensial"""
+        t = mulai
+        selesai = mulai + self.durasi
+        jeda_rata = self.burst / self.rate
+        while t < selesai:
+            t += self.random.expovariate(1.0 / jeda_rata)
+            ukuran = 1
+            while self.random.random() > 1.0 / self.burst:
+                ukuran += 1
+            for _ in range(ukuran):
+                if t < selesai:
+                    yield t
+
+    def run(self):
+        mulai = time.perf_counter()
+        for jadwal in self.jadwal(mulai):
+            sekarang = time.perf_counter()
+            if jadwal > sekarang:
+                time.sleep(jadwal - sekarang)
+
+            qr_data, mode = self.aliran.berikutnya()
+            t0 = time.perf_counter()
+            if mode == 'masuk':
+                ok = self.firebase.send_barang_masuk(qr_data)
+            else:
+                ok = self.firebase.send_barang_keluar(qr_data)
+            t1 = time.perf_counter()
+
+            self.latensi_layanan.append(t1 - t0)
+            self.latensi_respon.append(t1 - max(jadwal, mulai))
+            if ok:
+                self.sukses[mode] += 1
+            else:
+                self.gagal[mode] += 1
+
+    def kuras(self, percobaan=20):
+        """Kirim ulang scan yang masih di outbox; sisa yang gagal dihitung sebagai tertunda"""
+        for _ in range(percobaan):
+            if self.firebase.flush():
+                break
+        for event in self.firebase.pending:
+            self.tertunda[event['mode']] += 1
+
+def baca_counter(firebase, percobaan=20):
+    """Baca nilai total dan ringkasan saat ini (diulang jika database sedang gagal)"""
+    for _ in range(percobaan - 1):
+        try:
+            return baca_counter_sekali(firebase)
+        except Exception:
+            time.sleep(0.05)
+    return baca_counter_sekali(firebase)
+
+def baca_counter_sekali(firebase):
+    """Satu kali baca total dan ringkasan"""
+    db = firebase.db
+    ringkasan = db.child('ringkasan').get() or {}
+    return {
+        'total_masuk': db.child('barang_masuk').child('total').get() or 0,
+        'total_keluar': db.child('barang_keluar').child('total').get() or 0,
+        'ringkasan_masuk': ringkasan.get('total_masuk', 0),
+        'ringkasan_keluar': ringkasan.get('total_keluar', 0),
+        'ringkasan_sisa': ringkasan.get('sisa_barang', 0)
+    }
+
+def agregasi(firebase, percobaan=20):
+    """Agregasi shard counter, diulang jika database sedang gagal"""
+    for _ in range(percobaan):
+        if firebase.agregasi() is not None:
+            return True
+        time.sleep(0.05)
+    return False
+
+def jalankan(args):
+    """Jalankan uji beban dan cetak laporan"""
+    rate_per_stasiun = args.rate / args.stasiun
+    stasiun = []
+    for i in range(args.stasiun):
+        aliran = AliranScan(i, payload_unik=args.payload_unik, rasio_ulang=args.rasio_ulang,
+                            pola_mode=args.pola_mode, rasio_keluar=args.rasio_keluar,
+                            seed=None if args.seed is None else args.seed + i)
+        stasiun.append(Stasiun(i, args.url, args.credential, rate_per_stasiun, args.burst,
+                               args.durasi, aliran, args.counter_shard))
+
+    if not stasiun[0].firebase.db:
+        print("❌ Database tidak tersedia, uji beban dibatalkan")
+        return None
+
+    if args.counter_shard:
+        agregasi(stasiun[0].firebase)
+
+    awal = baca_counter(stasiun[0].firebase)
+
+    print(f"\n🚀 Uji beban: {args.stasiun} stasiun, {args.rate} scan/detik, burst {args.burst}, "
+          f"{args.durasi} detik")
+    t_mulai = time.perf_counter()
+    for s in stasiun:
+        s.start()
+    for s in stasiun:
+        s.join()
+    t_total = time.perf_counter() - t_mulai
+
+    # Scan yang gagal tetap di outbox dan harus tersimpan tepat sekali setelah dikirim ulang
+    for s in stasiun:
+        s.kuras()
+
+    # Mode shard: total dan ringkasan baru terisi setelah agregasi
+    if args.counter_shard:
+        agregasi(stasiun[0].firebase)
+
+    akhir = baca_counter(stasiun[0].firebase)
+
+    layanan = sorted(x for s in stasiun for x in s.latensi_layanan)
+    respon = sorted(x for s in stasiun for x in s.latensi_respon)
+    sukses_masuk = sum(s.sukses['masuk'] for s in stasiun)
+    sukses_keluar = sum(s.sukses['keluar'] for s in stasiun)
+    gagal = sum(s.gagal['masuk'] + s.gagal['keluar'] for s in stasiun)
+    tertunda = sum(s.tertunda['masuk'] + s.tertunda['keluar'] for s in stasiun)
+
+    # Counter dianggap tepat jika bertambah persis sebanyak scan yang akhirnya tersimpan
+    tersimpan_masuk = sukses_masuk + sum(s.gagal['masuk'] - s.tertunda['masuk'] for s in stasiun)
+    tersimpan_keluar = sukses_keluar + sum(s.gagal['keluar'] - s.tertunda['keluar'] for s in stasiun)
+    harapan = {
+        'total_masuk': awal['total_masuk'] + tersimpan_masuk,
+        'total_keluar': awal['total_keluar'] + tersimpan_keluar,
+        'ringkasan_masuk': awal['ringkasan_masuk'] + tersimpan_masuk,
+        'ringkasan_keluar': awal['ringkasan_keluar'] + tersimpan_keluar,
+        'ringkasan_sisa': awal['ringkasan_sisa'] + tersimpan_masuk - tersimpan_keluar
+    }
+    selisih = {key: akhir[key] - harapan[key] for key in harapan if akhir[key] != harapan[key]}
+
+    laporan = {
+        'event': len(layanan),
+        'sukses': sukses_masuk + sukses_keluar,
+        'gagal': gagal,
+        'tertunda': tertunda,
+        'durasi': t_total,
+        'event_per_detik': (sukses_masuk + sukses_keluar) / t_total if t_total > 0 else 0.0,
+        'layanan_ms': {p: persentil(layanan, p) * 1000 for p in (50, 95, 99, 100)},
+        'respon_ms': {p: persentil(respon, p) * 1000 for p in (50, 95, 99, 100)},
+        'counter_tepat': not selisih,
+        'selisih_counter': selisih
+    }
+
+    print("\n" + "=" * 50)
+    print("LAPORAN UJI BEBAN")
+    print("=" * 50)
+    print(f"Event dikirim   : {laporan['event']} (sukses {laporan['sukses']}, gagal {gagal}, "
+          f"masih tertunda {tertunda})")
+    print(f"Durasi          : {t_total:.2f} detik")
+    print(f"Throughput      : {laporan['event_per_detik']:.1f} event/detik")
+    for nama, nilai in (('Latensi layanan', laporan['layanan_ms']), ('Latensi respon ', laporan['respon_ms'])):
+        print(f"{nama} : p50 {nilai[50]:.1f} ms | p95 {nilai[95]:.1f} ms | "
+              f"p99 {nilai[99]:.1f} ms | max {nilai[100]:.1f} ms")
+    if laporan['counter_tepat']:
+        print("✅ Counter total dan ringkasan tepat")
+    else:
+        print(f"❌ Counter tidak tepat (aktual - harapan): {selisih}")
+    print("=" * 50)
+    return laporan
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator beban scan untuk FirebaseManager")
+    parser.add_argument('--url', default='lokal://beban?latency=0.002&jitter=0.002',
+                        help="URL database (default: database lokal dengan latensi 2-4 ms)")
+    parser.add_argument('--credential', default=None, help="Path service account (untuk Firebase asli)")
+    parser.add_argument('--stasiun', type=int, default=4, help="Jumlah stasiun paralel")
+    parser.add_argument('--rate', type=float, default=200.0, help="Total scan per detik semua stasiun")
+    parser.add_argument('--burst', type=float, default=1.0, help="Rata-rata scan per burst (1 = tanpa burst)")
+    parser.add_argument('--durasi', type=float, default=10.0, help="Lama pengujian (detik)")
+    parser.add_argument('--payload-unik', type=int, default=500, help="Jumlah payload berbeda")
+    parser.add_argument('--rasio-ulang', type=float, default=0.3, help="Peluang payload diulang")
+    parser.add_argument('--pola-mode', default='acak', choices=['acak', 'selang-seling', 'masuk', 'keluar'])
+    parser.add_argument('--rasio-keluar', type=float, default=0.4, help="Peluang mode keluar (pola acak)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed random")
+    parser.add_argument('--counter-shard', action='store_true',
+                        help="Counter per stasiun, total dihitung lewat agregasi")
+    jalankan(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
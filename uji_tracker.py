@@ -0,0 +1,81 @@
+import numpy as np
+
+from FinishMode import QRTracker
+
+# Uji perhitungan sekali per track pada QRTracker.
+# Label yang tetap terlihat tetapi decode-nya berselang (frame dilewati governor atau decode
+# gagal sesaat) harus tetap satu track dan dihitung tepat sekali; label yang benar-benar
+# pergi lalu datang lagi dihitung lagi, walaupun kembali ke posisi yang sama dengan cepat.
+
+def bbox(x, y, ukuran=80):
+    """Titik sudut QR dengan bentuk (1, 4, 2) seperti hasil decode"""
+    return np.array([[[x, y], [x + ukuran, y], [x + ukuran, y + ukuran], [x, y + ukuran]]],
+                    dtype=np.float32)
+
+def hitung(tracker, jadwal):
+    """
+    Jalankan tracker untuk jadwal decode dan hitung berapa kali QR dihitung
+
+    Args:
+        tracker: QRTracker
+        jadwal: List (timestamp, terdeteksi) untuk setiap frame yang di-decode; satu label
+            yang bergerak perlahan
+    """
+    jumlah = 0
+    for i, (t, terdeteksi) in enumerate(jadwal):
+        detections = [("BARANG-001", bbox(100 + i * 2, 200))] if terdeteksi else []
+        for track_id, _, _ in tracker.update(detections, t):
+            if tracker.tandai_dihitung(track_id):
+                jumlah += 1
+    return jumlah
+
+def uji_decode_berselang():
+    """Decode tiap 1/8 frame pada 25 FPS, dengan beberapa decode gagal berturut-turut"""
+    tracker = QRTracker()
+    periode = 8 / 25.0
+    gagal = {3, 4, 5, 9, 10}
+    jadwal = [(i * periode, i not in gagal) for i in range(20)]
+    jumlah = hitung(tracker, jadwal)
+    assert jumlah == 1, f"label berselang dihitung {jumlah} kali"
+
+def uji_decode_gagal_sesaat():
+    """Decode setiap frame pada 30 FPS, decode gagal 4 frame berturut-turut"""
+    tracker = QRTracker()
+    jadwal = [(i / 30.0, not 10 <= i < 14) for i in range(40)]
+    jumlah = hitung(tracker, jadwal)
+    assert jumlah == 1, f"label berselang dihitung {jumlah} kali"
+
+def uji_masuk_lagi_cepat():
+    """Decode setiap frame pada 30 FPS; label pergi lalu kembali ke posisi yang sama"""
+    for jeda in (0.6, 1.5, 1.9):
+        tracker = QRTracker()
+        jadwal = []
+        for i in range(30):
+            jadwal.append((i / 30.0, True))
+        kosong = int(round(jeda * 30))
+        for i in range(kosong):
+            jadwal.append(((30 + i) / 30.0, False))
+        for i in range(30):
+            jadwal.append(((30 + kosong + i) / 30.0, True))
+
+        # Posisi sama saat kembali: hanya miss yang bisa memisahkan kedua lintasan
+        jumlah = 0
+        for t, terdeteksi in jadwal:
+            detections = [("BARANG-001", bbox(100, 200))] if terdeteksi else []
+            for track_id, _, _ in tracker.update(detections, t):
+                if tracker.tandai_dihitung(track_id):
+                    jumlah += 1
+        assert jumlah == 2, f"label kembali setelah {jeda} detik dihitung {jumlah} kali"
+
+def uji_label_kembali():
+    """Label yang hilang lebih lama dari timeout cadangan dihitung sebagai lintasan baru"""
+    tracker = QRTracker()
+    jadwal = [(i * 0.04, True) for i in range(10)]
+    jadwal += [(20.0 + i * 0.04, True) for i in range(10)]
+    jumlah = hitung(tracker, jadwal)
+    assert jumlah == 2, f"dua lintasan dihitung {jumlah} kali"
+
+if __name__ == "__main__":
+    for uji in (uji_decode_berselang, uji_decode_gagal_sesaat, uji_masuk_lagi_cepat, uji_label_kembali):
+        uji()
+        print(f"✅ {uji.__name__}")